@@ -6,12 +6,31 @@ from discord.ui import View, Button
 from discord import app_commands
 
 # Importar utilidades genéricas
-from . import utils
+from . import utils, io_pool
+from .jobs import motor, METRICAS_FILE
+from .despachante_dm import despachante
+from .editor_mensagens import editor
+from .telemetria import metricas_travas
+
+class SomenteDono(app_commands.CheckFailure):
+    pass
+
+def somente_dono():
+    """Restringe o comando de barra ao dono do bot."""
+    async def predicate(interaction: discord.Interaction) -> bool:
+        if not await interaction.client.is_owner(interaction.user):
+            raise SomenteDono()
+        return True
+    return app_commands.check(predicate)
 
 class Admin(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
+    async def cog_app_command_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        if isinstance(error, SomenteDono):
+            await interaction.response.send_message("❌ Apenas o dono do bot pode usar este comando.", ephemeral=True)
+
     @app_commands.command(name="comando_secretario", description="Mostra todos os comandos e informações do bot")
     async def comando_secretario(self, interaction: discord.Interaction):
         embed = discord.Embed(
@@ -38,5 +57,136 @@ class Admin(commands.Cog):
     
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
+    @app_commands.command(name="io_stats", description="Mostra quanto tempo o I/O de disco teria bloqueado o bot (dono)")
+    @somente_dono()
+    async def io_stats(self, interaction: discord.Interaction):
+        embed = discord.Embed(
+            title="💽 I/O fora do event loop",
+            description=f"Pool de {io_pool.MAX_WORKERS} threads. Tempos por chamada, em ms.",
+            color=discord.Color.dark_grey()
+        )
+        for rotulo, m in io_pool.resumo()[:25]:
+            embed.add_field(
+                name=rotulo,
+                value=(
+                    f"**Chamadas:** {m.chamadas} | **Erros:** {m.erros}\n"
+                    f"**Média:** {m.media * 1000:.1f} | **Máx:** {m.maximo * 1000:.1f} | **Última:** {m.ultima * 1000:.1f}\n"
+                    f"**Fila (total):** {m.espera_total * 1000:.0f}"
+                ),
+                inline=False
+            )
+        if not embed.fields:
+            embed.description += "\n\nNenhuma chamada registrada ainda."
+
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @app_commands.command(name="jobs", description="Lista os jobs agendados do bot (dono)")
+    @somente_dono()
+    async def jobs(self, interaction: discord.Interaction):
+        embed = discord.Embed(
+            title="⏱️ Jobs agendados",
+            description=f"{len(motor.jobs)} job(s) registrado(s).",
+            color=discord.Color.dark_grey()
+        )
+        for job in motor.listar()[:25]:
+            proxima = f"<t:{int(job.proxima.timestamp())}:R>" if job.proxima else "—"
+            if job.ultima_execucao:
+                ultima = f"<t:{int(job.ultima_execucao.timestamp())}:R> em {job.ultima_duracao * 1000:.0f} ms"
+            else:
+                ultima = "nunca"
+            valor = (
+                f"**Gatilho:** {job.gatilho} | **Dono:** {job.dono or '—'}\n"
+                f"**Próxima:** {proxima} | **Última:** {ultima}"
+            )
+            if job.em_execucao:
+                valor += "\n🔄 Em execução"
+            if job.ultimo_erro:
+                valor += f"\n⚠️ {job.ultimo_erro[:200]}"
+            embed.add_field(name=job.nome, value=valor, inline=False)
+
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @app_commands.command(name="dm_stats", description="Mostra as métricas de entrega de DMs (dono)")
+    @somente_dono()
+    async def dm_stats(self, interaction: discord.Interaction):
+        m = despachante.metricas
+        embed = discord.Embed(
+            title="✉️ Entrega de DMs",
+            description=f"Até {despachante.max_concorrencia} envios simultâneos.",
+            color=discord.Color.dark_grey()
+        )
+        embed.add_field(name="Entregues", value=str(m.enviados), inline=True)
+        embed.add_field(name="DM fechada", value=str(m.bloqueados), inline=True)
+        embed.add_field(name="Falhas", value=str(m.falhas), inline=True)
+        embed.add_field(name="Tempo por envio (ms)", value=f"**Média:** {m.media * 1000:.0f} | **Máx:** {m.maximo * 1000:.0f}", inline=False)
+        embed.add_field(name="Cache de canais", value=f"**Acertos:** {m.cache_acertos} | **Faltas:** {m.cache_faltas}", inline=False)
+
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @app_commands.command(name="edicoes_stats", description="Mostra quantas edições de painéis foram agrupadas (dono)")
+    @somente_dono()
+    async def edicoes_stats(self, interaction: discord.Interaction):
+        m = editor.metricas
+        embed = discord.Embed(
+            title="🖊️ Edições de painéis",
+            description=f"No máximo uma edição por mensagem a cada {editor.janela:g}s.",
+            color=discord.Color.dark_grey()
+        )
+        embed.add_field(name="Pedidos", value=str(m.pedidos), inline=True)
+        embed.add_field(name="Edições feitas", value=str(m.edicoes), inline=True)
+        embed.add_field(name="Agrupadas", value=str(m.agrupadas), inline=True)
+        embed.add_field(name="Falhas", value=str(m.falhas), inline=True)
+
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @app_commands.command(name="travas_stats", description="Mostra a contenção das travas de cada raid (dono)")
+    @somente_dono()
+    async def travas_stats(self, interaction: discord.Interaction):
+        embed = discord.Embed(
+            title="🔒 Travas das raids",
+            description="Tempos em ms. Contendidas: aquisições que precisaram esperar outra operação da mesma raid.",
+            color=discord.Color.dark_grey()
+        )
+        for raid, m in sorted(metricas_travas.items()):
+            embed.add_field(
+                name=raid,
+                value=(
+                    f"**Aquisições:** {m.aquisicoes} | **Contendidas:** {m.contendidas}\n"
+                    f"**Espera:** méd {m.espera_media * 1000:.1f} / máx {m.espera_maxima * 1000:.1f}\n"
+                    f"**Posse máx:** {m.posse_maxima * 1000:.1f}"
+                ),
+                inline=False
+            )
+        if not embed.fields:
+            embed.description += "\n\nNenhuma aquisição registrada ainda."
+
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @app_commands.command(name="jobs_metricas", description="Mostra atraso, duração, overruns e erros dos jobs (dono)")
+    @somente_dono()
+    async def jobs_metricas(self, interaction: discord.Interaction):
+        metricas = motor.metricas()
+        embed = discord.Embed(
+            title="📈 Telemetria dos jobs",
+            description=f"Tempos em ms. Arquivo completo: `{METRICAS_FILE}`.",
+            color=discord.Color.dark_grey()
+        )
+        itens = [(nome, m) for nome, m in metricas["jobs"].items()]
+        itens += [(f"prazos: {grupo}", m) for grupo, m in metricas["prazos"].items()]
+        for nome, m in itens[:25]:
+            histograma = " ".join(f"{faixa}:{qtd}" for faixa, qtd in m["duracao"]["histograma"].items() if qtd)
+            embed.add_field(
+                name=nome,
+                value=(
+                    f"**Execuções:** {m['execucoes']} | **Erros:** {m['erros']} | **Overruns:** {m['overruns']}\n"
+                    f"**Atraso:** méd {m['atraso']['medio'] * 1000:.0f} / máx {m['atraso']['maximo'] * 1000:.0f}\n"
+                    f"**Duração:** méd {m['duracao']['media'] * 1000:.0f} / máx {m['duracao']['maxima'] * 1000:.0f}"
+                    + (f"\n`{histograma}`" if histograma else "")
+                ),
+                inline=False
+            )
+
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
 async def setup(bot):
     await bot.add_cog(Admin(bot))
@@ -0,0 +1,124 @@
+# cogs/agendador.py
+"""
+Agendador de prazos exatos.
+
+Cada prazo (lembrete de raid, expiração de missão...) é registrado com o
+horário exato em que deve disparar. Os prazos ficam em um heap e uma única
+tarefa dorme até o mais próximo, então nada acorda à toa entre eles.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from datetime import datetime
+
+from .telemetria import MetricaExecucao
+
+logger = logging.getLogger(__name__)
+
+ESPERA_MAXIMA = 3600  # Segundos; reavalia o heap ao menos uma vez por hora (ajustes de relógio)
+
+
+class Agendador:
+    def __init__(self):
+        self._heap = []        # (quando, seq, chave)
+        self._entradas = {}    # chave -> (quando, seq, callback)
+        self._seq = itertools.count()
+        self._acordar = None
+        self._tarefa = None
+        self._execucoes = set()
+        self.metricas = {}     # grupo da chave ("lembrete", "missao"...) -> MetricaExecucao
+
+    # --- API ---
+
+    def agendar(self, chave: str, quando: datetime | float, callback):
+        """Agenda `callback()` (corrotina) para `quando`; substitui um prazo com a mesma chave."""
+        instante = quando.timestamp() if isinstance(quando, datetime) else float(quando)
+        seq = next(self._seq)
+        self._entradas[chave] = (instante, seq, callback)
+        heapq.heappush(self._heap, (instante, seq, chave))
+        self._garantir_tarefa()
+        if self._heap[0][1] == seq:
+            # O novo prazo é o mais próximo: acorda a tarefa para recalcular a espera
+            self._acordar.set()
+
+    def cancelar(self, chave: str) -> bool:
+        # Remoção preguiçosa: a entrada do heap é descartada quando chegar ao topo
+        return self._entradas.pop(chave, None) is not None
+
+    def cancelar_prefixo(self, prefixo: str) -> int:
+        chaves = [c for c in self._entradas if c.startswith(prefixo)]
+        for chave in chaves:
+            del self._entradas[chave]
+        return len(chaves)
+
+    def agendado(self, chave: str) -> bool:
+        return chave in self._entradas
+
+    def quando(self, chave: str) -> float | None:
+        entrada = self._entradas.get(chave)
+        return entrada[0] if entrada else None
+
+    def pendentes(self) -> list:
+        """[(chave, quando)] em ordem de disparo."""
+        return sorted(((c, e[0]) for c, e in self._entradas.items()), key=lambda item: item[1])
+
+    def parar(self):
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            self._tarefa = None
+
+    # --- Execução ---
+
+    def _garantir_tarefa(self):
+        if self._tarefa is None or self._tarefa.done():
+            self._acordar = asyncio.Event()
+            self._tarefa = asyncio.get_running_loop().create_task(self._executar())
+
+    def _topo_valido(self):
+        while self._heap:
+            instante, seq, chave = self._heap[0]
+            entrada = self._entradas.get(chave)
+            if entrada is not None and entrada[1] == seq:
+                return instante, chave
+            heapq.heappop(self._heap)  # Cancelado ou substituído
+        return None
+
+    async def _executar(self):
+        while True:
+            topo = self._topo_valido()
+            espera = ESPERA_MAXIMA if topo is None else min(topo[0] - time.time(), ESPERA_MAXIMA)
+            if espera > 0:
+                self._acordar.clear()
+                try:
+                    await asyncio.wait_for(self._acordar.wait(), timeout=espera)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._heap)
+            instante, _, callback = self._entradas.pop(topo[1])
+            tarefa = asyncio.create_task(self._disparar(topo[1], instante, callback))
+            self._execucoes.add(tarefa)
+            tarefa.add_done_callback(self._execucoes.discard)
+
+    async def _disparar(self, chave: str, instante: float, callback):
+        atraso = max(0.0, time.time() - instante)
+        inicio = time.perf_counter()
+        erro = False
+        try:
+            await callback()
+        except Exception as e:
+            erro = True
+            logger.error(f"💥 Erro ao executar prazo '{chave}': {e}")
+        finally:
+            grupo = chave.split(":", 1)[0]
+            self.metricas.setdefault(grupo, MetricaExecucao()).registrar(atraso, time.perf_counter() - inicio, erro)
+
+
+# Instância única usada por todos os cogs
+agendador = Agendador()
+
+__all__ = ['Agendador', 'agendador']
@@ -3,8 +3,9 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-from discord.ui import Button, View, Modal, TextInput
+from discord.ui import Button, View, Modal, TextInput, DynamicItem
 import logging
+import re
 
 logger = logging.getLogger(__name__)
 
@@ -48,14 +49,18 @@ class DenunciaModal(Modal):
         else:
             await interaction.response.send_message("❌ Canal de denúncias não encontrado.", ephemeral=True)
 
-class DenunciaButton(Button):
+class DenunciaButton(DynamicItem[Button], template="ajuda_denuncia"):
     def __init__(self):
-        super().__init__(
+        super().__init__(Button(
             label="Denúncia",
             style=discord.ButtonStyle.danger,
             emoji="🚨",
             custom_id="ajuda_denuncia"
-        )
+        ))
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: Button, match: re.Match):
+        return cls()
 
     async def callback(self, interaction: discord.Interaction):
         modal = DenunciaModal()
@@ -216,16 +221,29 @@ class AjudaModal(Modal):
             ephemeral=True
         )
 
-class AjudaButton(Button):
-    def __init__(self, tipo_ajuda: str, emoji: str):
-        super().__init__(
+# Tipos de ajuda do painel e seus emojis; o custom_id de cada botão é "ajuda_<tipo>"
+TIPOS_AJUDA = {
+    "PK": "⚔️",
+    "UP": "📈",
+    "Dúvidas": "❓",
+    "Procuro Grupo": "👥",
+}
+TIPO_POR_ID = {tipo.lower().replace(' ', '_'): tipo for tipo in TIPOS_AJUDA}
+
+class AjudaButton(DynamicItem[Button], template="ajuda_(?P<tipo>" + "|".join(map(re.escape, TIPO_POR_ID)) + ")"):
+    def __init__(self, tipo_ajuda: str):
+        super().__init__(Button(
             label=tipo_ajuda,
             style=discord.ButtonStyle.primary,
-            emoji=emoji,
+            emoji=TIPOS_AJUDA[tipo_ajuda],
             custom_id=f"ajuda_{tipo_ajuda.lower().replace(' ', '_')}"
-        )
+        ))
         self.tipo_ajuda = tipo_ajuda
 
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: Button, match: re.Match):
+        return cls(TIPO_POR_ID[match["tipo"]])
+
     async def callback(self, interaction: discord.Interaction):
         modal = AjudaModal(self.tipo_ajuda)
         await interaction.response.send_modal(modal)
@@ -234,16 +252,17 @@ class AjudaView(View):
     def __init__(self):
         super().__init__(timeout=None)
         # Adiciona os 4 botões com emojis
-        self.add_item(AjudaButton("PK", "⚔️"))
-        self.add_item(AjudaButton("UP", "📈"))
-        self.add_item(AjudaButton("Dúvidas", "❓"))
-        self.add_item(AjudaButton("Procuro Grupo", "👥"))
+        for tipo in TIPOS_AJUDA:
+            self.add_item(AjudaButton(tipo))
         self.add_item(DenunciaButton())
 
 class Ajuda(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        
+
+    def cog_unload(self):
+        self.bot.remove_dynamic_items(AjudaButton, DenunciaButton)
+
     @app_commands.command(name="ajuda", description="Cria o painel de ajuda com botões interativos")
     @app_commands.checks.has_permissions(administrator=True)
     async def ajuda(self, interaction: discord.Interaction):
@@ -272,4 +291,4 @@ class Ajuda(commands.Cog):
 async def setup(bot):
     cog = Ajuda(bot)
     await bot.add_cog(cog)
-    bot.add_view(AjudaView())  # Garante que a view persista após reinicializações
\ No newline at end of file
+    bot.add_dynamic_items(AjudaButton, DenunciaButton)  # Garante que os botões funcionem após reinicializações
\ No newline at end of file
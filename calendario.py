@@ -1,19 +1,20 @@
 import discord
 from discord.ext import commands
-from discord.ui import View, Button, TextInput, Modal, Select
+from discord.ui import View, Button, TextInput, Modal, Select, DynamicItem
 from discord import app_commands, ButtonStyle, Interaction
 import json
-import os
 from datetime import datetime, timedelta
 from pytz import timezone
 import pytz
 import logging
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.triggers.cron import CronTrigger
-from . import utils
+from . import utils, io_pool
+from .snapshots import SnapshotStore
+from .calendario_eventos import EventosCalendario
+from .jobs import motor, Horario
 import asyncio
-import shutil
-import hashlib
+import re
+import time
+from itertools import groupby
 
 logger = logging.getLogger(__name__)
 calendario_config = {}
@@ -21,6 +22,13 @@ calendario_config = {}
 # Lock para proteger acesso concorrente ao arquivo JSON do calendário
 _lock = asyncio.Lock()
 
+# Backups do calendário: conteúdo deduplicado, comprimido e com retenção
+_snapshots = SnapshotStore("calendario")
+_tarefas_snapshot = set()
+
+# Índice dos eventos (por ID e por data), montado uma vez a partir do store
+_eventos = None
+
 def carregar_configuracoes_calendario():
     global calendario_config
     try:
@@ -44,39 +52,99 @@ def formatar_data_entrada(data_str: str, ano: int) -> datetime | None:
     except Exception:
         return None
 
-def gerar_id_evento(evento: dict) -> str:
-    base = f"{evento['data']}{evento['hora']}{evento['titulo']}{evento['local']}"
-    return hashlib.sha256(base.encode('utf-8')).hexdigest()[:8]  # 8 chars do hash
-
-def backup_calendario():
+def _registrar_snapshot(conteudo: bytes, criado_em: float):
     """
-    Faz backup do arquivo de calendário atual, com timestamp.
+    Grava o snapshot (compressão, deduplicação e retenção) em uma thread.
+    `criado_em` vem de quem gravou o calendário, ainda com o _lock adquirido:
+    as threads do pool podem terminar fora de ordem, a ordem das gravações não.
     """
-    try:
-        if os.path.exists(utils.CALENDARIO_FILE):
-            backup_dir = os.path.join("data", "backups")
-            os.makedirs(backup_dir, exist_ok=True)
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_path = os.path.join(backup_dir, f"calendario_backup_{timestamp}.json")
-            shutil.copy(utils.CALENDARIO_FILE, backup_path)
-            logger.info(f"Backup do calendário criado em {backup_path}")
-    except Exception as e:
-        logger.error(f"Erro ao criar backup do calendário: {e}")
+    tarefa = asyncio.create_task(io_pool.executar("calendario.snapshot", _snapshots.salvar, conteudo, criado_em))
+    _tarefas_snapshot.add(tarefa)
+
+    def _finalizar(t: asyncio.Task):
+        _tarefas_snapshot.discard(t)
+        if not t.cancelled() and t.exception():
+            logger.error(f"Erro ao criar snapshot do calendário: {t.exception()}")
+
+    tarefa.add_done_callback(_finalizar)
+
+async def _obter_eventos() -> EventosCalendario:
+    # Deve ser chamada com o _lock adquirido
+    global _eventos
+    if _eventos is None:
+        _eventos = EventosCalendario()
+        if _eventos.substituir(await utils.carregar_calendario()):
+            # Eventos antigos, sem ID estável: grava os IDs recém-gerados
+            await _persistir()
+    return _eventos
+
+async def _persistir() -> bytes:
+    # Deve ser chamada com o _lock adquirido; devolve o conteúdo para o snapshot
+    eventos = _eventos.todos()
+    await utils.salvar_calendario(eventos)
+    return json.dumps(eventos, indent=4, ensure_ascii=False).encode("utf-8")
+
+async def carregar_eventos() -> EventosCalendario:
+    """
+    Retorna o índice de eventos do calendário de forma thread-safe.
+    """
+    async with _lock:
+        return await _obter_eventos()
 
 async def carregar_calendario():
     """
-    Carrega eventos do arquivo JSON de forma thread-safe.
+    Lista de eventos em ordem de data e hora.
     """
-    async with _lock:
-        return await utils.carregar_calendario()
+    return (await carregar_eventos()).todos()
 
 async def salvar_calendario(eventos):
     """
-    Salva eventos no arquivo JSON de forma thread-safe, criando backup antes.
+    Substitui todos os eventos; o snapshot é feito fora do lock e do loop.
     """
     async with _lock:
-        backup_calendario()
-        await utils.salvar_calendario(eventos)
+        (await _obter_eventos()).substituir(eventos)
+        conteudo = await _persistir()
+        criado_em = time.time()
+    _registrar_snapshot(conteudo, criado_em)
+
+async def adicionar_evento(evento: dict) -> str:
+    async with _lock:
+        evento_id = (await _obter_eventos()).adicionar(evento)
+        conteudo = await _persistir()
+        criado_em = time.time()
+    _registrar_snapshot(conteudo, criado_em)
+    return evento_id
+
+async def editar_evento(evento_id: str, campos: dict) -> bool:
+    async with _lock:
+        if not (await _obter_eventos()).editar(evento_id, campos):
+            return False
+        conteudo = await _persistir()
+        criado_em = time.time()
+    _registrar_snapshot(conteudo, criado_em)
+    return True
+
+async def remover_evento(evento_id: str) -> dict | None:
+    async with _lock:
+        evento = (await _obter_eventos()).remover(evento_id)
+        if evento is None:
+            return None
+        conteudo = await _persistir()
+        criado_em = time.time()
+    _registrar_snapshot(conteudo, criado_em)
+    return evento
+
+def agrupar_por_dia(eventos: list) -> list:
+    """[(date, [eventos])] a partir de uma lista já ordenada por data."""
+    grupos = []
+    for data_str, itens in groupby(eventos, key=lambda e: e.get("data")):
+        try:
+            dia = datetime.strptime(data_str, "%Y-%m-%d").date()
+        except Exception as e:
+            logger.error(f"Data inválida no calendário '{data_str}': {e}")
+            continue
+        grupos.append((dia, list(itens)))
+    return grupos
 
 def nome_dia_semana_pt(dia_ingles: str) -> str:
     nomes = {
@@ -166,9 +234,7 @@ class ModalAdicionarEvento(Modal, title="➕ Adicionar Evento"):
             "descricao": self.descricao.value.strip() if self.descricao.value else "Nenhuma descrição fornecida."
         }
 
-        eventos = await carregar_calendario()
-        eventos.append(novo_evento)
-        await salvar_calendario(eventos)
+        await adicionar_evento(novo_evento)
 
         await interaction.response.send_message(
             f"✅ Evento '{self.titulo.value}' adicionado!",
@@ -192,7 +258,7 @@ class ModalEditarEvento(Modal, title="✏️ Editar Evento"):
 
     def __init__(self, evento_original, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.evento_original = evento_original
+        self.evento_id = evento_original["id"]
 
         self.data.default = datetime.strptime(evento_original["data"], "%Y-%m-%d").strftime("%d/%m")
         self.hora.default = evento_original["hora"]
@@ -213,19 +279,17 @@ class ModalEditarEvento(Modal, title="✏️ Editar Evento"):
             await interaction.response.send_message("❌ Hora inválida. Use HH:MM.", ephemeral=True)
             return
 
-        eventos = await carregar_calendario()
-        for i, evento in enumerate(eventos):
-            if evento == self.evento_original:
-                eventos[i] = {
-                    "data": data_obj.strftime("%Y-%m-%d"),
-                    "hora": self.hora.value.strip(),
-                    "titulo": self.titulo.value.strip(),
-                    "local": self.local.value.strip(),
-                    "descricao": self.descricao.value.strip() or "Nenhuma descrição fornecida."
-                }
-                break
+        atualizado = await editar_evento(self.evento_id, {
+            "data": data_obj.strftime("%Y-%m-%d"),
+            "hora": self.hora.value.strip(),
+            "titulo": self.titulo.value.strip(),
+            "local": self.local.value.strip(),
+            "descricao": self.descricao.value.strip() or "Nenhuma descrição fornecida."
+        })
+        if not atualizado:
+            await interaction.response.send_message("❌ Evento não encontrado.", ephemeral=True)
+            return
 
-        await salvar_calendario(eventos)
         await interaction.response.send_message("✅ Evento atualizado com sucesso!", ephemeral=True)
 
         canal_id = utils.calendario_config.get("canal_id")
@@ -253,11 +317,7 @@ class ModalRemoverEvento(Modal, title="❌ Confirmar Remoção"):
             await interaction.response.send_message("❌ Digite exatamente 'remover'.", ephemeral=True)
             return
 
-        eventos = await carregar_calendario()
-        if self.evento_para_remover in eventos:
-            eventos.remove(self.evento_para_remover)
-            await salvar_calendario(eventos)
-
+        if await remover_evento(self.evento_para_remover["id"]):
             await interaction.response.send_message("✅ Evento removido!", ephemeral=True)
 
             canal_id = utils.calendario_config.get("canal_id")
@@ -283,19 +343,21 @@ class EventoSelect(Select):
 
         options = []
         eventos_pagina = paginar_lista(eventos, pagina, self.itens_por_pagina)
-        for i, evento in enumerate(eventos_pagina):
+        for evento in eventos_pagina:
             label = f"{evento['titulo']} ({evento['data']} {evento['hora']})"
             if len(label) > 100:
                 label = label[:97] + "..."
-            options.append(discord.SelectOption(label=label, value=str(i)))
+            options.append(discord.SelectOption(label=label, value=evento["id"]))
 
         placeholder = f"Selecione um evento ({pagina+1}/{self.paginas_totais})"
 
         super().__init__(placeholder=placeholder, min_values=1, max_values=1, options=options)
 
     async def callback(self, interaction: Interaction):
-        indice = int(self.values[0]) + self.pagina * self.itens_por_pagina
-        evento_selecionado = self.eventos[indice]
+        evento_selecionado = (await carregar_eventos()).obter(self.values[0])
+        if evento_selecionado is None:
+            await interaction.response.send_message("❌ Evento não encontrado.", ephemeral=True)
+            return
 
         if self.acao == "editar":
             modal = ModalEditarEvento(evento_selecionado)
@@ -350,44 +412,43 @@ class SelecionarEventoView(View):
         except Exception:
             pass
 
-class CalendarioView(View):
-    def __init__(self):
-        super().__init__(timeout=None)
-
-    async def on_timeout(self):
-        # Desabilita botões após timeout
-        for child in self.children:
-            child.disabled = True
-        try:
-            if self.message:
-                await self.message.edit(content="⏰ Painel expirado.", view=self)
-        except Exception:
-            pass
+# Botões do painel de administração: (rótulo, estilo) por ação do custom_id "<acao>_event"
+BOTOES_CALENDARIO = {
+    "add": ("➕ Adicionar Evento", ButtonStyle.green),
+    "edit": ("✏️ Editar Evento", ButtonStyle.blurple),
+    "remove": ("❌ Remover Evento", ButtonStyle.danger),
+}
+
+class BotaoCalendario(DynamicItem[Button], template=r"(?P<acao>add|edit|remove)_event"):
+    def __init__(self, acao: str):
+        label, style = BOTOES_CALENDARIO[acao]
+        super().__init__(Button(label=label, style=style, custom_id=f"{acao}_event"))
+        self.acao = acao
 
-    @discord.ui.button(label="➕ Adicionar Evento", style=ButtonStyle.green, custom_id="add_event")
-    async def botao_adicionar(self, interaction: Interaction, button: Button):
-        modal = ModalAdicionarEvento()
-        await interaction.response.send_modal(modal)
+    @classmethod
+    async def from_custom_id(cls, interaction: Interaction, item: Button, match: re.Match):
+        return cls(match["acao"])
 
-    @discord.ui.button(label="✏️ Editar Evento", style=ButtonStyle.blurple, custom_id="edit_event")
-    async def botao_editar(self, interaction: Interaction, button: Button):
-        eventos = await carregar_calendario()
-        if not eventos:
-            await interaction.response.send_message("❌ Nenhum evento para editar.", ephemeral=True)
+    async def callback(self, interaction: Interaction):
+        if self.acao == "add":
+            modal = ModalAdicionarEvento()
+            await interaction.response.send_modal(modal)
             return
 
-        view = SelecionarEventoView(eventos, acao="editar")
-        await interaction.response.send_message("Selecione o evento que deseja editar:", view=view, ephemeral=True)
-
-    @discord.ui.button(label="❌ Remover Evento", style=ButtonStyle.danger, custom_id="remove_event")
-    async def botao_remover(self, interaction: Interaction, button: Button):
         eventos = await carregar_calendario()
+        acao = "editar" if self.acao == "edit" else "remover"
         if not eventos:
-            await interaction.response.send_message("❌ Nenhum evento para remover.", ephemeral=True)
+            await interaction.response.send_message(f"❌ Nenhum evento para {acao}.", ephemeral=True)
             return
 
-        view = SelecionarEventoView(eventos, acao="remover")
-        await interaction.response.send_message("Selecione o evento que deseja remover:", view=view, ephemeral=True)
+        view = SelecionarEventoView(eventos, acao=acao)
+        await interaction.response.send_message(f"Selecione o evento que deseja {acao}:", view=view, ephemeral=True)
+
+class CalendarioView(View):
+    def __init__(self):
+        super().__init__(timeout=None)
+        for acao in BOTOES_CALENDARIO:
+            self.add_item(BotaoCalendario(acao))
 
 
 # Funções de envio calendário, com logging aprimorado e tratamento
@@ -406,17 +467,8 @@ async def enviar_calendario_semanal(bot):
         logger.error(f"Canal do calendário (ID: {canal_id}) não encontrado para envio semanal.")
         return
 
-    eventos = await carregar_calendario()
-    eventos_por_dia = {}
-    for evento in eventos:
-        try:
-            data_evento = datetime.strptime(evento["data"], "%Y-%m-%d").date()
-        except Exception as e:
-            logger.error(f"Data inválida no evento '{evento.get('titulo', 'sem título')}': {e}")
-            continue
-        eventos_por_dia.setdefault(data_evento, []).append(evento)
-
-    dias_ordenados = sorted(eventos_por_dia.keys())
+    # Os próximos 7 dias a partir de hoje, já em ordem pelo índice
+    eventos = (await carregar_eventos()).proximos_dias(now.date(), 7)
 
     embed = discord.Embed(
         title="🗓️ Calendário Semanal da Guilda",
@@ -426,12 +478,12 @@ async def enviar_calendario_semanal(bot):
     embed.set_thumbnail(url=utils.calendario_config.get("thumbnail_url", "https://cdn-icons-png.flaticon.com/128/591/591576.png"))
     embed.set_footer(text=get_footer_text())
 
-    for dia in dias_ordenados:
+    for dia, eventos_do_dia in agrupar_por_dia(eventos):
         dia_semana = nome_dia_semana_pt(dia.strftime("%A"))
         data_formatada = f"{dia_semana}, {dia.strftime('%d/%m')}"
 
         linhas = []
-        for evento in eventos_por_dia[dia]:
+        for evento in eventos_do_dia:
             linhas.append(f"🕒 **{evento['hora']}** - {evento['titulo']}")
 
         valor = "\n".join(linhas)
@@ -459,8 +511,7 @@ async def enviar_calendario_diario(bot):
         logger.error(f"Canal do calendário (ID: {canal_id}) não encontrado para envio diário.")
         return
 
-    eventos = await carregar_calendario()
-    eventos_do_dia = [e for e in eventos if e.get("data") == now.strftime("%Y-%m-%d")]
+    eventos_do_dia = (await carregar_eventos()).do_dia(now.date())
 
     dia_semana = nome_dia_semana_pt(now.strftime("%A"))
 
@@ -493,27 +544,23 @@ async def enviar_calendario_diario(bot):
     except Exception as e:
         logger.error(f"Erro ao enviar calendário diário: {e}")
 
-def limpar_eventos_antigos():
+async def limpar_eventos_antigos():
     """
-    Remove eventos cuja data já passou do arquivo de calendário.
+    Remove eventos cuja data já passou do calendário.
     """
     try:
-        eventos = utils.carregar_calendario()
         tz = timezone(utils.calendario_config.get("timezone", "America/Sao_Paulo"))
         hoje = datetime.now(tz).date()
 
-        eventos_validos = []
-        for e in eventos:
-            try:
-                data_evento = datetime.strptime(e["data"], "%Y-%m-%d").date()
-                if data_evento >= hoje:
-                    eventos_validos.append(e)
-            except Exception as err:
-                logger.error(f"Erro ao interpretar data do evento para limpeza: {err}")
-
-        if len(eventos_validos) < len(eventos):
-            utils.salvar_calendario(eventos_validos)
-            logger.info(f"🧹 Limpeza realizada: {len(eventos) - len(eventos_validos)} evento(s) removido(s).")
+        async with _lock:
+            removidos = (await _obter_eventos()).remover_anteriores(hoje)
+            if removidos:
+                conteudo = await _persistir()
+                criado_em = time.time()
+
+        if removidos:
+            _registrar_snapshot(conteudo, criado_em)
+            logger.info(f"🧹 Limpeza realizada: {removidos} evento(s) removido(s).")
         else:
             logger.info("🧹 Limpeza: Nenhum evento antigo para remover.")
 
@@ -524,12 +571,22 @@ class Calendario(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         utils.carregar_configuracoes_calendario()
-        self.scheduler = AsyncIOScheduler(timezone=utils.calendario_config.get("timezone", "America/Sao_Paulo"))
-        self.scheduler.add_job(self.enviar_calendario_semanal_job, CronTrigger(day_of_week='sun', hour=9, minute=0))
-        self.scheduler.add_job(self.enviar_calendario_diario_job, CronTrigger(hour=9, minute=0))
-        self.scheduler.add_job(self.enviar_calendario_diario_job, CronTrigger(hour=15, minute=0))
-        self.scheduler.add_job(limpar_eventos_antigos, CronTrigger(hour=4, minute=0))
-        self.scheduler.start()
+        fuso = utils.calendario_config.get("timezone", "America/Sao_Paulo")
+        dono = self.qualified_name
+        motor.registrar("calendario.semanal", Horario("09:00", dias_semana={6}, fuso=fuso), self.enviar_calendario_semanal_job, dono)
+        motor.registrar("calendario.diario", Horario("09:00", "15:00", fuso=fuso), self.enviar_calendario_diario_job, dono)
+        motor.registrar("calendario.limpeza", Horario("04:00", fuso=fuso), limpar_eventos_antigos, dono)
+        bot.loop.create_task(self._importar_backups_legados())
+
+    def cog_unload(self):
+        motor.remover_do_dono(self.qualified_name)
+        self.bot.remove_dynamic_items(BotaoCalendario)
+
+    async def _importar_backups_legados(self):
+        try:
+            await io_pool.executar("calendario.importar_backups", _snapshots.importar_legados)
+        except Exception as e:
+            logger.error(f"Erro ao converter backups antigos do calendário: {e}")
 
     async def enviar_calendario_semanal_job(self):
         await enviar_calendario_semanal(self.bot)
@@ -540,8 +597,6 @@ class Calendario(commands.Cog):
     @commands.Cog.listener()
     async def on_ready(self):
         logger.info("✅ Módulo de Calendário carregado e pronto.")
-        self.bot.add_view(CalendarioView())
-        
 
     @app_commands.command(name="calendario", description="Mostra o calendário de eventos da semana")
     async def mostrar_calendario(self, interaction: discord.Interaction):
@@ -566,21 +621,11 @@ class Calendario(commands.Cog):
         if not eventos:
             embed.description = "Nenhum evento cadastrado no momento."
         else:
-            eventos_por_dia = {}
-            for evento in eventos:
-                try:
-                    data_evento = datetime.strptime(evento["data"], "%Y-%m-%d").date()
-                except Exception:
-                    continue
-                eventos_por_dia.setdefault(data_evento, []).append(evento)
-
-            dias_ordenados = sorted(eventos_por_dia.keys())
-
-            for dia in dias_ordenados:
+            for dia, eventos_do_dia in agrupar_por_dia(eventos):
                 dia_semana = nome_dia_semana_pt(dia.strftime("%A"))
                 data_formatada = f"{dia_semana}, {dia.strftime('%d/%m')}"
                 texto = ""
-                for evento in eventos_por_dia[dia]:
+                for evento in eventos_do_dia:
                     texto += f"⏰ **{evento['hora']}** - {evento['titulo']}\n"
                     texto += f"📍 **Local:** {evento['local']}\n"
                     desc_curta = evento['descricao'][:100] + ("..." if len(evento['descricao']) > 100 else "")
@@ -592,5 +637,41 @@ class Calendario(commands.Cog):
 
         await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
 
+    @app_commands.command(name="restaurar_calendario", description="Restaura o calendário a partir de um backup")
+    @app_commands.describe(snapshot="Backup a restaurar (mais recentes primeiro)")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def restaurar_calendario(self, interaction: discord.Interaction, snapshot: str):
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        try:
+            conteudo = await io_pool.executar("calendario.ler_snapshot", _snapshots.ler, snapshot)
+        except (KeyError, OSError):
+            await interaction.followup.send("❌ Backup não encontrado.", ephemeral=True)
+            return
+
+        eventos = json.loads(conteudo)
+        await salvar_calendario(eventos)
+        await interaction.followup.send(
+            f"✅ Calendário restaurado a partir do backup `{snapshot[:8]}` ({len(eventos)} evento(s)).",
+            ephemeral=True
+        )
+        try:
+            await enviar_calendario_semanal(self.bot)
+        except Exception as e:
+            logger.error(f"Erro ao atualizar calendário: {e}")
+
+    @restaurar_calendario.autocomplete("snapshot")
+    async def snapshot_autocomplete(self, interaction: discord.Interaction, current: str):
+        tz = timezone(utils.calendario_config.get("timezone", "America/Sao_Paulo"))
+        escolhas = []
+        for s in await io_pool.executar("calendario.listar_snapshots", _snapshots.listar):
+            quando = datetime.fromtimestamp(s["criado_em"], tz).strftime("%d/%m/%Y %H:%M:%S")
+            nome = f"{quando} — {s['hash'][:8]}"
+            if current.lower() in nome.lower():
+                escolhas.append(app_commands.Choice(name=nome, value=s["hash"]))
+            if len(escolhas) == 25:
+                break
+        return escolhas
+
 async def setup(bot):
+    bot.add_dynamic_items(BotaoCalendario)
     await bot.add_cog(Calendario(bot))
@@ -0,0 +1,119 @@
+# cogs/calendario_eventos.py
+"""
+Eventos do calendário indexados por ID estável e por data.
+
+Os eventos ficam em um dicionário id -> evento e em um índice ordenado de
+chaves (data, hora, id). Como "AAAA-MM-DD" e "HH:MM" ordenam como texto,
+as consultas por intervalo ("hoje", "esta semana", "próximos N") são duas
+buscas binárias no índice.
+"""
+
+import bisect
+import hashlib
+from datetime import date, timedelta
+from itertools import islice
+
+CAMPOS = ("data", "hora", "titulo", "local", "descricao")
+
+
+def gerar_id_evento(evento: dict) -> str:
+    base = f"{evento['data']}{evento['hora']}{evento['titulo']}{evento['local']}"
+    return hashlib.sha256(base.encode('utf-8')).hexdigest()[:8]  # 8 chars do hash
+
+
+def _chave(evento: dict) -> tuple:
+    return (evento.get("data", ""), evento.get("hora", ""), evento["id"])
+
+
+class EventosCalendario:
+    def __init__(self, eventos: list | None = None):
+        self._por_id = {}
+        self._indice = []
+        self.substituir(eventos or [])
+
+    def substituir(self, eventos: list) -> bool:
+        """Reconstrói o índice. Retorna True se algum evento precisou receber um ID."""
+        self._por_id = {}
+        self._indice = []
+        novos_ids = False
+        for evento in eventos:
+            if not evento.get("id") or evento["id"] in self._por_id:
+                evento["id"] = self._novo_id(evento)
+                novos_ids = True
+            self._por_id[evento["id"]] = evento
+            self._indice.append(_chave(evento))
+        self._indice.sort()
+        return novos_ids
+
+    def _novo_id(self, evento: dict) -> str:
+        # O ID nasce do conteúdo original e não muda mais, mesmo após edições
+        id_ = gerar_id_evento(evento)
+        tentativa = 0
+        while id_ in self._por_id:
+            tentativa += 1
+            id_ = gerar_id_evento({**evento, "local": f"{evento['local']}#{tentativa}"})
+        return id_
+
+    # --- Consultas ---
+
+    def __len__(self):
+        return len(self._indice)
+
+    def obter(self, evento_id: str) -> dict | None:
+        return self._por_id.get(evento_id)
+
+    def todos(self) -> list:
+        """Todos os eventos em ordem de data e hora."""
+        return [self._por_id[k[2]] for k in self._indice]
+
+    def intervalo(self, inicio: date, fim: date) -> list:
+        """Eventos com inicio <= data <= fim, em ordem."""
+        esq = bisect.bisect_left(self._indice, (inicio.isoformat(),))
+        dir_ = bisect.bisect_left(self._indice, ((fim + timedelta(days=1)).isoformat(),))
+        return [self._por_id[k[2]] for k in self._indice[esq:dir_]]
+
+    def do_dia(self, dia: date) -> list:
+        return self.intervalo(dia, dia)
+
+    def proximos_dias(self, dia: date, dias: int = 7) -> list:
+        """Eventos de `dia` até `dia + dias - 1` (ex.: a semana a partir de hoje)."""
+        return self.intervalo(dia, dia + timedelta(days=dias - 1))
+
+    def proximos(self, n: int, a_partir_de: date) -> list:
+        """Os próximos `n` eventos a partir de uma data."""
+        esq = bisect.bisect_left(self._indice, (a_partir_de.isoformat(),))
+        return [self._por_id[k[2]] for k in islice(self._indice, esq, esq + n)]
+
+    # --- Alterações ---
+
+    def adicionar(self, evento: dict) -> str:
+        evento["id"] = self._novo_id(evento)
+        self._por_id[evento["id"]] = evento
+        bisect.insort(self._indice, _chave(evento))
+        return evento["id"]
+
+    def editar(self, evento_id: str, campos: dict) -> bool:
+        evento = self._por_id.get(evento_id)
+        if evento is None:
+            return False
+        self._indice.pop(bisect.bisect_left(self._indice, _chave(evento)))
+        evento.update({c: campos[c] for c in CAMPOS if c in campos})
+        bisect.insort(self._indice, _chave(evento))
+        return True
+
+    def remover(self, evento_id: str) -> dict | None:
+        evento = self._por_id.pop(evento_id, None)
+        if evento is not None:
+            self._indice.pop(bisect.bisect_left(self._indice, _chave(evento)))
+        return evento
+
+    def remover_anteriores(self, dia: date) -> int:
+        """Remove os eventos com data anterior a `dia`. Retorna quantos saíram."""
+        corte = bisect.bisect_left(self._indice, (dia.isoformat(),))
+        for chave in self._indice[:corte]:
+            del self._por_id[chave[2]]
+        del self._indice[:corte]
+        return corte
+
+
+__all__ = ['EventosCalendario', 'gerar_id_evento', 'CAMPOS']
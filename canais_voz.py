@@ -0,0 +1,296 @@
+# cogs/canais_voz.py
+"""
+Ciclo de vida dos canais de voz temporários.
+
+Um único gerenciador cria (ou reaproveita) o canal de cada horário de raid,
+acompanha quando cada canal da categoria ficou vazio e o libera exatamente
+TEMPO_VIDA_CANAL minutos depois, pelo agendador de prazos. O estado dos
+canais de raid só é gravado quando muda, e é conferido com a guild uma única
+vez na inicialização.
+
+Criar e apagar canais são das rotas mais limitadas do Discord, então os
+canais de raid vêm de um pool de canais pré-criados: na atribuição o canal
+livre é só renomeado, e ao expirar volta para o pool (ou é apagado se o pool
+já estiver acima de POOL_VOZ_MAXIMO). Quando o pool cai abaixo de
+POOL_VOZ_MINIMO, ele é reposto em segundo plano até POOL_VOZ_TAMANHO.
+O Discord permite só 2 renomeações a cada 10 minutos por canal, o que basta
+para um ciclo atribuir/devolver por raid.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from functools import partial
+
+import discord
+from pytz import timezone
+
+from . import utils
+from .agendador import agendador
+from .store import store
+
+logger = logging.getLogger(__name__)
+
+CANAL_TEMP_FILE = os.path.join("data", "canais_temporarios.json")
+POOL_FILE = os.path.join("data", "canais_voz_pool.json")
+PREFIXO_PRAZO = "voz_ociosa:"
+LIMITE_USUARIOS = 10
+NOME_CANAL_LIVRE = "🔈 Raid (livre)"
+
+
+class GerenciadorCanaisVoz:
+    def __init__(self, bot):
+        self.bot = bot
+        # {guild_id (str): {f"{raid}_{hora}": {"canal_id": id, "criacao": iso, "vazio_desde": ts}}}
+        self.canais = store.carregar(CANAL_TEMP_FILE, {})
+        # {guild_id (str): [canal_id, ...]} canais livres prontos para uso
+        self.pool = store.carregar(POOL_FILE, {})
+        self._reconciliado = False
+        self._reposicoes = {}  # guild_id -> tarefa de reposição em andamento
+
+    # --- Estado ---
+
+    def _salvar(self):
+        store.marcar_sujo(CANAL_TEMP_FILE)
+
+    def _registro(self, canal_id: int) -> dict | None:
+        for canais in self.canais.values():
+            for info in canais.values():
+                if info["canal_id"] == canal_id:
+                    return info
+        return None
+
+    def _esquecer(self, guild_id: int, canal_id: int) -> bool:
+        canais = self.canais.get(str(guild_id), {})
+        for chave, info in list(canais.items()):
+            if info["canal_id"] == canal_id:
+                del canais[chave]
+                if not canais:
+                    del self.canais[str(guild_id)]
+                return True
+        return False
+
+    def no_pool(self, canal) -> bool:
+        return canal.id in self.pool.get(str(canal.guild.id), [])
+
+    def na_categoria(self, canal) -> bool:
+        """Canais da categoria sujeitos à expiração por ociosidade (os livres do pool ficam de fora)."""
+        return (
+            isinstance(canal, discord.VoiceChannel)
+            and canal.category_id == utils.CATEGORIA_VOZ_ID
+            and not self.no_pool(canal)
+        )
+
+    # --- Pool ---
+
+    def _retirar_do_pool(self, guild: discord.Guild) -> discord.VoiceChannel | None:
+        livres = self.pool.get(str(guild.id), [])
+        while livres:
+            canal = guild.get_channel(livres.pop())
+            self._salvar_pool()
+            if isinstance(canal, discord.VoiceChannel) and not canal.members:
+                return canal
+        return None
+
+    def _salvar_pool(self):
+        store.marcar_sujo(POOL_FILE)
+
+    def _verificar_pool(self, guild: discord.Guild):
+        """Dispara a reposição em segundo plano se o pool estiver abaixo da marca mínima."""
+        if len(self.pool.get(str(guild.id), [])) >= utils.POOL_VOZ_MINIMO:
+            return
+        tarefa = self._reposicoes.get(guild.id)
+        if tarefa is None or tarefa.done():
+            self._reposicoes[guild.id] = asyncio.create_task(self._repor_pool(guild))
+
+    async def _repor_pool(self, guild: discord.Guild):
+        categoria = guild.get_channel(utils.CATEGORIA_VOZ_ID)
+        if not isinstance(categoria, discord.CategoryChannel):
+            return
+        livres = self.pool.setdefault(str(guild.id), [])
+        criados = 0
+        try:
+            while len(livres) < utils.POOL_VOZ_TAMANHO:
+                canal = await categoria.create_voice_channel(
+                    name=NOME_CANAL_LIVRE,
+                    reason="Pool de canais de raid"
+                )
+                livres.append(canal.id)
+                criados += 1
+                self._salvar_pool()
+        except discord.HTTPException as e:
+            logger.error(f"❌ Erro ao repor o pool de canais de voz: {e}")
+        if criados:
+            logger.info(f"🧊 Pool de canais de voz reposto: +{criados} (livres: {len(livres)})")
+
+    async def _devolver(self, canal: discord.VoiceChannel) -> bool:
+        """Devolve um canal de raid expirado ao pool. Retorna False se o pool já está cheio."""
+        livres = self.pool.setdefault(str(canal.guild.id), [])
+        if len(livres) >= utils.POOL_VOZ_MAXIMO:
+            return False
+        await canal.edit(name=NOME_CANAL_LIVRE, user_limit=0, reason="Canal de raid devolvido ao pool")
+        livres.append(canal.id)
+        self._salvar_pool()
+        logger.info(f"♻️ Canal {canal.id} devolvido ao pool (livres: {len(livres)})")
+        return True
+
+    # --- Criação / reuso ---
+
+    async def canal_da_raid(self, guild: discord.Guild, raid: str, hora: str) -> discord.VoiceChannel | None:
+        """Canal de voz do horário da raid; reaproveita o existente ou cria um novo."""
+        categoria = guild.get_channel(utils.CATEGORIA_VOZ_ID)
+        if not isinstance(categoria, discord.CategoryChannel):
+            return None
+
+        chave = f"{raid}_{hora}"
+        info = self.canais.get(str(guild.id), {}).get(chave)
+        canal = guild.get_channel(info["canal_id"]) if info else None
+        if canal is not None:
+            return canal
+
+        nome_canal = f"Raid {raid} - {hora}"
+        canal = discord.utils.get(categoria.voice_channels, name=nome_canal)
+        if canal is None:
+            canal = self._retirar_do_pool(guild)
+            if canal is not None:
+                await canal.edit(name=nome_canal, user_limit=LIMITE_USUARIOS, reason="Canal do pool atribuído à raid")
+                logger.info(f"🎤 Canal do pool atribuído: {nome_canal} ({canal.id})")
+            else:
+                canal = await categoria.create_voice_channel(
+                    name=nome_canal,
+                    reason="Canal temporário para raid",
+                    user_limit=LIMITE_USUARIOS
+                )
+                logger.info(f"🎤 Canal temporário criado: {nome_canal} ({canal.id})")
+            self._verificar_pool(guild)
+
+        self.canais.setdefault(str(guild.id), {})[chave] = {
+            "canal_id": canal.id,
+            "criacao": datetime.now(timezone("America/Sao_Paulo")).isoformat(),
+            "vazio_desde": None,
+        }
+        if not canal.members:
+            self.marcar_ocioso(canal)
+        self._salvar()
+        return canal
+
+    # --- Ociosidade ---
+
+    def marcar_ocioso(self, canal: discord.VoiceChannel, desde: float | None = None):
+        """Agenda a exclusão do canal para TEMPO_VIDA_CANAL minutos depois de ficar vazio."""
+        desde = desde or time.time()
+        info = self._registro(canal.id)
+        if info is not None and info.get("vazio_desde") != desde:
+            info["vazio_desde"] = desde
+            self._salvar()
+        agendador.agendar(
+            f"{PREFIXO_PRAZO}{canal.id}",
+            desde + utils.TEMPO_VIDA_CANAL * 60,
+            partial(self._expirar, canal.guild.id, canal.id)
+        )
+
+    def marcar_ativo(self, canal: discord.VoiceChannel):
+        agendador.cancelar(f"{PREFIXO_PRAZO}{canal.id}")
+        info = self._registro(canal.id)
+        if info is not None and info.get("vazio_desde") is not None:
+            info["vazio_desde"] = None
+            self._salvar()
+
+    async def _expirar(self, guild_id: int, canal_id: int):
+        guild = self.bot.get_guild(guild_id)
+        canal = guild.get_channel(canal_id) if guild else None
+        if canal is not None and canal.members:
+            return
+        if canal is not None:
+            try:
+                # Canais de raid voltam para o pool; os demais (ou com o pool cheio) são apagados
+                if self._registro(canal_id) is None or not await self._devolver(canal):
+                    await canal.delete(reason="Limpeza automática de canal temporário")
+                    logger.info(f"♻️ Canal '{canal.name}' deletado por inatividade")
+            except discord.Forbidden:
+                logger.warning(f"⛔ Sem permissão para deletar canal {canal.name}")
+                return
+            except discord.HTTPException as e:
+                logger.error(f"❌ Erro ao deletar canal: {e}")
+                return
+        if self._esquecer(guild_id, canal_id):
+            self._salvar()
+
+    # --- Eventos ---
+
+    def ao_mudar_voz(self, before: discord.VoiceState, after: discord.VoiceState):
+        if before.channel == after.channel:
+            return  # Mute, deafen, stream...
+        if after.channel and self.na_categoria(after.channel):
+            self.marcar_ativo(after.channel)
+        if before.channel and self.na_categoria(before.channel) and not before.channel.members:
+            self.marcar_ocioso(before.channel)
+
+    def ao_remover_canal(self, canal):
+        agendador.cancelar(f"{PREFIXO_PRAZO}{canal.id}")
+        if self._esquecer(canal.guild.id, canal.id):
+            self._salvar()
+        livres = self.pool.get(str(canal.guild.id), [])
+        if canal.id in livres:
+            livres.remove(canal.id)
+            self._salvar_pool()
+
+    def reconciliar(self):
+        """Confere o estado salvo com a guild (uma vez por processo)."""
+        if self._reconciliado:
+            return
+        self._reconciliado = True
+        alterado = False
+
+        # Remove registros de canais que não existem mais
+        for guild_id, canais in list(self.canais.items()):
+            guild = self.bot.get_guild(int(guild_id))
+            if guild is None:
+                continue
+            for chave, info in list(canais.items()):
+                if guild.get_channel(info["canal_id"]) is None:
+                    del canais[chave]
+                    alterado = True
+            if not canais:
+                del self.canais[guild_id]
+                alterado = True
+
+        # Remove do pool os canais que não existem mais
+        for guild_id, livres in self.pool.items():
+            guild = self.bot.get_guild(int(guild_id))
+            if guild is None:
+                continue
+            existentes = [c for c in livres if isinstance(guild.get_channel(c), discord.VoiceChannel)]
+            if len(existentes) != len(livres):
+                livres[:] = existentes
+                self._salvar_pool()
+
+        # Reagenda a ociosidade dos canais vazios da categoria
+        for guild in self.bot.guilds:
+            categoria = guild.get_channel(utils.CATEGORIA_VOZ_ID)
+            if not isinstance(categoria, discord.CategoryChannel):
+                continue
+            for canal in categoria.voice_channels:
+                info = self._registro(canal.id)
+                if canal.members:
+                    if info is not None and info.get("vazio_desde") is not None:
+                        info["vazio_desde"] = None
+                        alterado = True
+                elif not self.no_pool(canal):
+                    # Sem registro anterior, a contagem começa agora
+                    self.marcar_ocioso(canal, (info or {}).get("vazio_desde"))
+            self._verificar_pool(guild)
+
+        if alterado:
+            self._salvar()
+        logger.info("🔎 Canais de voz temporários conferidos com a guild")
+
+    def parar(self):
+        agendador.cancelar_prefixo(PREFIXO_PRAZO)
+        for tarefa in self._reposicoes.values():
+            tarefa.cancel()
+
+
+__all__ = ['GerenciadorCanaisVoz', 'CANAL_TEMP_FILE', 'POOL_FILE', 'LIMITE_USUARIOS', 'NOME_CANAL_LIVRE']
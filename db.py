@@ -0,0 +1,123 @@
+# cogs/db.py
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DB_FILE = "data/bot.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    chave TEXT PRIMARY KEY,
+    valor TEXT
+);
+CREATE TABLE IF NOT EXISTS documentos (
+    nome TEXT PRIMARY KEY,
+    conteudo TEXT NOT NULL,
+    atualizado_em REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS raid_inscricoes (
+    raid TEXT NOT NULL,
+    usuario TEXT NOT NULL,
+    hora TEXT NOT NULL,
+    inscrito_em REAL NOT NULL,
+    PRIMARY KEY (raid, usuario)
+);
+CREATE TABLE IF NOT EXISTS missoes_historico (
+    posicao INTEGER PRIMARY KEY,
+    conteudo TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS raid_journal (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    op TEXT NOT NULL,
+    raid TEXT,
+    usuario TEXT,
+    hora TEXT,
+    criado_em REAL NOT NULL
+);
+"""
+
+
+class Database:
+    """
+    Banco SQLite único do bot, em modo WAL.
+
+    A conexão é compartilhada entre o event loop (leituras na inicialização)
+    e a thread de gravação do store, por isso todo acesso passa pelo lock.
+    """
+
+    def __init__(self, caminho: str = DB_FILE):
+        self.caminho = caminho
+        self._conn = None
+        self._lock = threading.RLock()
+
+    def conexao(self) -> sqlite3.Connection:
+        with self._lock:
+            if self._conn is None:
+                diretorio = os.path.dirname(self.caminho)
+                if diretorio:
+                    os.makedirs(diretorio, exist_ok=True)
+                self._conn = sqlite3.connect(self.caminho, check_same_thread=False, isolation_level=None)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("PRAGMA synchronous=NORMAL")
+                self._conn.executescript(SCHEMA)
+                logger.info(f"🗄️ Banco de estado aberto em {self.caminho}")
+            return self._conn
+
+    def consultar(self, sql: str, params=()) -> list:
+        with self._lock:
+            return self.conexao().execute(sql, params).fetchall()
+
+    def executar_lote(self, operacoes):
+        """Executa uma sequência de (sql, params) em uma única transação."""
+        with self._lock:
+            conn = self.conexao()
+            conn.execute("BEGIN")
+            try:
+                for sql, params in operacoes:
+                    conn.execute(sql, params)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    # --- Documentos JSON inteiros ---
+
+    def ler_documento(self, nome: str):
+        linhas = self.consultar("SELECT conteudo FROM documentos WHERE nome = ?", (nome,))
+        return linhas[0][0] if linhas else None
+
+    @staticmethod
+    def op_gravar_documento(nome: str, conteudo: str):
+        return (
+            "INSERT INTO documentos (nome, conteudo, atualizado_em) VALUES (?, ?, ?) "
+            "ON CONFLICT(nome) DO UPDATE SET conteudo = excluded.conteudo, atualizado_em = excluded.atualizado_em",
+            (nome, conteudo, time.time()),
+        )
+
+    # --- Meta ---
+
+    def ler_meta(self, chave: str):
+        linhas = self.consultar("SELECT valor FROM meta WHERE chave = ?", (chave,))
+        return linhas[0][0] if linhas else None
+
+    @staticmethod
+    def op_gravar_meta(chave: str, valor: str):
+        return (
+            "INSERT INTO meta (chave, valor) VALUES (?, ?) "
+            "ON CONFLICT(chave) DO UPDATE SET valor = excluded.valor",
+            (chave, valor),
+        )
+
+    def fechar(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+__all__ = ['Database', 'DB_FILE']
@@ -0,0 +1,150 @@
+# cogs/despachante_dm.py
+"""
+Envio de DMs em paralelo, dentro dos limites do Discord.
+
+Os envios de uma rodada (ex.: todos os inscritos de um horário de raid) saem
+em paralelo, limitados por um semáforo e por um balde de tokens por rota do
+Discord (buscar usuário, abrir DM, enviar mensagem), já que cada rota tem o
+seu próprio limite. Os 429 que ainda escaparem são tratados pelo discord.py,
+que respeita os buckets informados nos cabeçalhos de cada rota. Usuários e
+canais de DM ficam em cache, então um destinatário conhecido custa uma única
+chamada HTTP (o envio) em vez de buscar o usuário e abrir o canal toda vez.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+MAX_CONCORRENCIA = 5      # Envios simultâneos
+TAMANHO_CACHE = 1000      # Canais de DM guardados (LRU)
+
+# (rajada, tokens por segundo) de cada rota. Abrir DMs tem um limite bem mais baixo que
+# enviar mensagens; o envio é limitado por canal, e como cada DM é um canal diferente
+# o que pesa é o limite global de 50 req/s, do qual ficamos bem abaixo.
+LIMITES_ROTA = {
+    "usuario": (5, 2.0),      # GET /users/{user.id}
+    "dm": (5, 1.0),           # POST /users/@me/channels
+    "mensagem": (20, 10.0),   # POST /channels/{channel.id}/messages
+}
+
+
+class BaldeTokens:
+    """Balde de tokens simples: cada requisição consome um token; os tokens repõem a uma taxa fixa."""
+
+    def __init__(self, capacidade: int, taxa: float):
+        self.capacidade = capacidade
+        self.taxa = taxa
+        self._tokens = float(capacidade)
+        self._atualizado = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def adquirir(self):
+        async with self._lock:
+            while True:
+                agora = time.monotonic()
+                self._tokens = min(self.capacidade, self._tokens + (agora - self._atualizado) * self.taxa)
+                self._atualizado = agora
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.taxa)
+
+
+class MetricaDM:
+    __slots__ = ("enviados", "bloqueados", "falhas", "cache_acertos", "cache_faltas", "total", "maximo")
+
+    def __init__(self):
+        self.enviados = 0
+        self.bloqueados = 0   # DMs fechadas (Forbidden)
+        self.falhas = 0
+        self.cache_acertos = 0
+        self.cache_faltas = 0
+        self.total = 0.0
+        self.maximo = 0.0
+
+    def registrar_envio(self, duracao: float):
+        self.enviados += 1
+        self.total += duracao
+        self.maximo = max(self.maximo, duracao)
+
+    @property
+    def media(self) -> float:
+        return self.total / self.enviados if self.enviados else 0.0
+
+
+class DespachanteDM:
+    def __init__(self, max_concorrencia: int = MAX_CONCORRENCIA):
+        self.max_concorrencia = max_concorrencia
+        self.metricas = MetricaDM()
+        self._bot = None
+        self._semaforo = None
+        self._baldes = None       # rota -> BaldeTokens
+        self._canais = OrderedDict()  # user_id -> DMChannel
+
+    def vincular(self, bot):
+        self._bot = bot
+
+    def _preparar(self):
+        # Criados sob demanda para pertencerem ao event loop em execução
+        if self._semaforo is None:
+            self._semaforo = asyncio.Semaphore(self.max_concorrencia)
+            self._baldes = {rota: BaldeTokens(*limite) for rota, limite in LIMITES_ROTA.items()}
+
+    async def _canal_dm(self, user_id: int) -> discord.DMChannel:
+        canal = self._canais.get(user_id)
+        if canal is not None:
+            self._canais.move_to_end(user_id)
+            self.metricas.cache_acertos += 1
+            return canal
+
+        self.metricas.cache_faltas += 1
+        user = self._bot.get_user(user_id)
+        if user is None:
+            await self._baldes["usuario"].adquirir()
+            user = await self._bot.fetch_user(user_id)
+        canal = user.dm_channel
+        if canal is None:
+            await self._baldes["dm"].adquirir()
+            canal = await user.create_dm()
+
+        self._canais[user_id] = canal
+        if len(self._canais) > TAMANHO_CACHE:
+            self._canais.popitem(last=False)
+        return canal
+
+    async def enviar(self, user_id: int, **kwargs) -> bool:
+        """Envia uma DM (mesmos argumentos de `Messageable.send`). Retorna se foi entregue."""
+        self._preparar()
+        async with self._semaforo:
+            inicio = time.perf_counter()
+            try:
+                canal = await self._canal_dm(user_id)
+                await self._baldes["mensagem"].adquirir()
+                await canal.send(**kwargs)
+            except discord.Forbidden:
+                self.metricas.bloqueados += 1
+                logger.info(f"📪 DM fechada para o usuário {user_id}")
+                return False
+            except discord.HTTPException as e:
+                self.metricas.falhas += 1
+                self._canais.pop(user_id, None)
+                logger.error(f"❌ Erro ao enviar DM para {user_id}: {e}")
+                return False
+            self.metricas.registrar_envio(time.perf_counter() - inicio)
+            return True
+
+    async def enviar_para_todos(self, user_ids, **kwargs) -> int:
+        """Envia a mesma DM para vários usuários em paralelo. Retorna quantas foram entregues."""
+        resultados = await asyncio.gather(*(self.enviar(uid, **kwargs) for uid in user_ids))
+        return sum(resultados)
+
+
+# Instância única usada por todos os cogs
+despachante = DespachanteDM()
+
+__all__ = ['DespachanteDM', 'BaldeTokens', 'MetricaDM', 'despachante', 'MAX_CONCORRENCIA', 'LIMITES_ROTA']
@@ -0,0 +1,98 @@
+# cogs/editor_mensagens.py
+"""
+Edições agrupadas de mensagens de painel.
+
+Quadros muito clicados (raids, missões, ranking) não editam a mensagem a cada
+interação: a interação é confirmada na hora, o estado muda em memória e o
+editor aplica no máximo uma edição por mensagem a cada `janela` segundos.
+A primeira edição sai imediatamente; as que chegam dentro da janela se juntam
+em uma só, feita no fim da janela com o estado mais recente, já que o
+conteúdo é renderizado só no momento da edição.
+"""
+
+import logging
+import time
+from functools import partial
+
+import discord
+
+from . import utils
+from .agendador import agendador
+
+logger = logging.getLogger(__name__)
+
+PREFIXO_PRAZO = "edicao:"
+
+
+class MetricaEdicoes:
+    __slots__ = ("pedidos", "edicoes", "agrupadas", "falhas")
+
+    def __init__(self):
+        self.pedidos = 0
+        self.edicoes = 0
+        self.agrupadas = 0  # Pedidos absorvidos por uma edição já pendente
+        self.falhas = 0
+
+
+class EditorMensagens:
+    def __init__(self, janela: float = utils.JANELA_EDICAO):
+        self.janela = janela
+        self.metricas = MetricaEdicoes()
+        self._pendentes = {}  # msg_id -> (mensagem, renderizar, ao_sumir)
+        self._ultima = {}     # msg_id -> instante da última edição
+
+    def agendar(self, mensagem: discord.Message | discord.PartialMessage, renderizar, ao_sumir=None):
+        """
+        Pede uma edição de `mensagem`. `renderizar()` é chamado na hora da edição e
+        retorna os argumentos de `Message.edit` (ou None para desistir); `ao_sumir()`
+        é chamado se a mensagem tiver sido apagada.
+        """
+        self.metricas.pedidos += 1
+        if mensagem.id in self._pendentes:
+            self.metricas.agrupadas += 1
+        self._pendentes[mensagem.id] = (mensagem, renderizar, ao_sumir)
+
+        chave = f"{PREFIXO_PRAZO}{mensagem.id}"
+        if agendador.agendado(chave):
+            return  # A edição já marcada usará o estado mais recente
+        liberada = self._ultima.get(mensagem.id, 0.0) + self.janela
+        agendador.agendar(chave, max(time.time(), liberada), partial(self._editar, mensagem.id))
+
+    def pendente(self, msg_id: int) -> bool:
+        return msg_id in self._pendentes
+
+    async def _editar(self, msg_id: int):
+        entrada = self._pendentes.pop(msg_id, None)
+        if entrada is None:
+            return
+        mensagem, renderizar, ao_sumir = entrada
+        agora = time.time()
+        # Esquece mensagens sem edição recente para o dicionário não crescer
+        self._ultima = {m: t for m, t in self._ultima.items() if agora - t < self.janela}
+        self._ultima[msg_id] = agora
+
+        conteudo = renderizar()
+        if conteudo is None:
+            return
+        try:
+            await mensagem.edit(**conteudo)
+            self.metricas.edicoes += 1
+        except discord.NotFound:
+            self.metricas.falhas += 1
+            if ao_sumir is not None:
+                ao_sumir()
+        except discord.HTTPException as e:
+            self.metricas.falhas += 1
+            logger.error(f"❌ Erro ao editar a mensagem {msg_id}: {e}")
+
+    async def descarregar(self):
+        """Aplica já as edições pendentes (usado no desligamento)."""
+        agendador.cancelar_prefixo(PREFIXO_PRAZO)
+        for msg_id in list(self._pendentes):
+            await self._editar(msg_id)
+
+
+# Instância única usada por todos os cogs
+editor = EditorMensagens()
+
+__all__ = ['EditorMensagens', 'MetricaEdicoes', 'editor']
@@ -0,0 +1,93 @@
+# cogs/historico_missoes.py
+"""
+Histórico de missões append-only, paginado do mais recente para o mais antigo.
+
+Cada entrada é uma linha de missoes_historico com uma posição sequencial
+(1, 2, 3...). Como a posição é contínua, a página k é o intervalo
+[total - k*tamanho - tamanho + 1, total - k*tamanho], lido direto do banco
+pelo índice da chave primária, sem manter o histórico em memória.
+
+As entradas acrescentadas desde o último flush do store ficam em um buffer
+pequeno e completam a página lida do banco, então paginar não força um flush.
+"""
+
+import json
+import logging
+
+from . import io_pool
+
+logger = logging.getLogger(__name__)
+
+DOCUMENTO_LEGADO = "historico"  # historico.json / documento antigo (lista, mais recente primeiro)
+
+SQL_INSERIR = "INSERT OR REPLACE INTO missoes_historico (posicao, conteudo) VALUES (?, ?)"
+
+
+def ops_importar(itens: list) -> list:
+    """Operações que substituem o histórico pela lista antiga (mais recente primeiro)."""
+    ops = [("DELETE FROM missoes_historico", ())]
+    total = len(itens)
+    for i, item in enumerate(itens):
+        ops.append((SQL_INSERIR, (total - i, json.dumps(item, ensure_ascii=False))))
+    return ops
+
+
+def exportar(db) -> list:
+    """Histórico completo no formato antigo (mais recente primeiro)."""
+    return [json.loads(c) for (c,) in db.consultar("SELECT conteudo FROM missoes_historico ORDER BY posicao DESC")]
+
+
+class HistoricoMissoes:
+    def __init__(self, store):
+        self.store = store
+        self.total = 0
+        self._pendentes = {}  # posicao -> entrada ainda não gravada no banco
+
+    def carregar(self):
+        """Lê apenas o total de entradas; converte o documento antigo na primeira vez."""
+        self.store.abrir()
+        legado = self.store.db.ler_documento(DOCUMENTO_LEGADO)
+        if legado is not None:
+            itens = json.loads(legado)
+            ops = ops_importar(itens)
+            ops.append(("DELETE FROM documentos WHERE nome = ?", (DOCUMENTO_LEGADO,)))
+            self.store.db.executar_lote(ops)
+            logger.info(f"📜 {len(itens)} entrada(s) do histórico convertida(s) para o log append-only")
+        self.total = self.store.consultar("SELECT COALESCE(MAX(posicao), 0) FROM missoes_historico")[0][0]
+
+    def acrescentar(self, item: dict):
+        """Acrescenta uma entrada no fim do log (O(1), gravada no próximo flush)."""
+        self.total += 1
+        self._pendentes[self.total] = item
+        self.store.enfileirar(SQL_INSERIR, (self.total, json.dumps(item, ensure_ascii=False)))
+
+    def total_paginas(self, tamanho: int) -> int:
+        return max(1, (self.total + tamanho - 1) // tamanho)
+
+    async def pagina(self, pagina: int, tamanho: int) -> list:
+        """Entradas da página `pagina`, da mais recente para a mais antiga."""
+        fim = self.total - pagina * tamanho
+        if fim <= 0:
+            return []
+        inicio = max(1, fim - tamanho + 1)
+        linhas = await io_pool.executar(
+            "historico.pagina",
+            self.store.consultar,
+            "SELECT posicao, conteudo FROM missoes_historico WHERE posicao BETWEEN ? AND ?",
+            (inicio, fim),
+        )
+        gravadas = {posicao: json.loads(c) for posicao, c in linhas}
+        if gravadas:
+            # O flush grava as entradas em ordem: tudo até a maior posição lida já está no banco
+            gravado_ate = max(gravadas)
+            for posicao in [p for p in self._pendentes if p <= gravado_ate]:
+                del self._pendentes[posicao]
+        itens = []
+        for posicao in range(fim, inicio - 1, -1):
+            item = gravadas.get(posicao, self._pendentes.get(posicao))
+            if item is not None:
+                itens.append(item)
+        return itens
+
+
+__all__ = ['HistoricoMissoes', 'ops_importar', 'exportar', 'DOCUMENTO_LEGADO']
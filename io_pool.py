@@ -0,0 +1,108 @@
+# cogs/io_pool.py
+"""
+Pool de threads dedicado para o I/O de disco dos cogs.
+
+Toda chamada bloqueante (banco, snapshots, arquivos) passa por `executar`,
+que roda a função em um pool limitado e mede quanto tempo ela teria
+bloqueado o event loop se fosse chamada diretamente.
+"""
+
+import asyncio
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+MAX_WORKERS = 4
+LIMITE_LENTO = 0.1  # Segundos; chamadas acima disso são registradas no log
+
+
+class MetricaIO:
+    __slots__ = ("chamadas", "erros", "total", "maximo", "ultima", "espera_total")
+
+    def __init__(self):
+        self.chamadas = 0
+        self.erros = 0
+        self.total = 0.0
+        self.maximo = 0.0
+        self.ultima = 0.0
+        self.espera_total = 0.0
+
+    def registrar(self, duracao: float, espera: float, erro: bool):
+        self.chamadas += 1
+        self.erros += int(erro)
+        self.total += duracao
+        self.ultima = duracao
+        self.maximo = max(self.maximo, duracao)
+        self.espera_total += espera
+
+    @property
+    def media(self) -> float:
+        return self.total / self.chamadas if self.chamadas else 0.0
+
+
+class IOExecutor:
+    def __init__(self, max_workers: int = MAX_WORKERS):
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+        self.metricas = {}
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="bot-io")
+        return self._executor
+
+    def _medir(self, rotulo: str, enfileirado_em: float, func, *args, **kwargs):
+        inicio = time.perf_counter()
+        erro = False
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            erro = True
+            raise
+        finally:
+            duracao = time.perf_counter() - inicio
+            with self._lock:
+                self.metricas.setdefault(rotulo, MetricaIO()).registrar(duracao, inicio - enfileirado_em, erro)
+            if duracao > LIMITE_LENTO:
+                logger.warning(f"🐢 I/O lento em '{rotulo}': {duracao * 1000:.0f} ms (teria bloqueado o loop)")
+
+    async def executar(self, rotulo: str, func, *args, **kwargs):
+        """Executa `func` no pool de I/O e aguarda o resultado."""
+        loop = asyncio.get_running_loop()
+        chamada = functools.partial(self._medir, rotulo, time.perf_counter(), func, *args, **kwargs)
+        return await loop.run_in_executor(self._pool(), chamada)
+
+    def resumo(self) -> list:
+        """Métricas por rótulo, das que mais bloqueariam o loop para as que menos."""
+        with self._lock:
+            itens = [(rotulo, m) for rotulo, m in self.metricas.items()]
+        return sorted(itens, key=lambda item: item[1].total, reverse=True)
+
+    def desligar(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+# Instância única usada por todos os cogs
+_pool = IOExecutor()
+
+
+async def executar(rotulo: str, func, *args, **kwargs):
+    return await _pool.executar(rotulo, func, *args, **kwargs)
+
+
+def resumo() -> list:
+    return _pool.resumo()
+
+
+def desligar():
+    _pool.desligar()
+
+
+__all__ = ['IOExecutor', 'MetricaIO', 'executar', 'resumo', 'desligar', 'MAX_WORKERS']
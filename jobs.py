@@ -0,0 +1,237 @@
+# cogs/jobs.py
+"""
+Motor de jobs único do bot.
+
+Todo trabalho periódico (limpezas, resets, envios do calendário...) é um job
+nomeado registrado aqui. Registrar de novo com o mesmo nome substitui o job
+anterior, então recarregar um cog nunca duplica agendamentos; cada cog remove
+os seus em `cog_unload` com `remover_do_dono`. Os disparos usam o agendador
+de prazos exatos.
+
+A última execução bem-sucedida de cada job é persistida. Se o bot estava
+fora do ar no horário previsto, o job roda uma única vez ao ser registrado,
+desde que o atraso esteja dentro da tolerância do job.
+"""
+
+import logging
+import time
+from datetime import datetime, timedelta
+from functools import partial
+
+from pytz import timezone
+
+from . import io_pool
+from .agendador import agendador
+from .store import store
+from .telemetria import MetricaExecucao, gravar_json
+
+logger = logging.getLogger(__name__)
+
+FUSO_PADRAO = "America/Sao_Paulo"
+UTC = timezone("UTC")
+JOBS_FILE = "data/jobs_estado.json"
+TOLERANCIA_PADRAO = timedelta(hours=6)  # Atraso máximo para recuperar um disparo perdido
+METRICAS_FILE = "data/jobs_metricas.json"
+INTERVALO_METRICAS = 5  # Minutos entre gravações do arquivo de métricas
+
+
+# --- Gatilhos ---
+
+class Intervalo:
+    """Dispara a cada `segundos`; a primeira execução é imediata (como tasks.loop)."""
+
+    def __init__(self, segundos: float = 0, minutos: float = 0, horas: float = 0, imediato: bool = True):
+        self.duracao = timedelta(seconds=segundos, minutes=minutos, hours=horas)
+        self.imediato = imediato
+
+    def primeiro(self, agora: datetime) -> datetime:
+        return agora if self.imediato else agora + self.duracao
+
+    def proximo(self, anterior: datetime, agora: datetime) -> datetime:
+        proximo = anterior + self.duracao
+        return proximo if proximo > agora else agora + self.duracao
+
+    def __str__(self):
+        minutos = int(self.duracao.total_seconds() // 60)
+        return f"a cada {minutos} min" if minutos < 60 else f"a cada {minutos // 60}h"
+
+
+class Horario:
+    """Dispara em horários fixos do dia (HH:MM), opcionalmente só em alguns dias da semana (0 = segunda)."""
+
+    def __init__(self, *horarios: str, dias_semana: set | None = None, fuso: str = FUSO_PADRAO):
+        self.horarios = sorted(datetime.strptime(h, "%H:%M").time() for h in horarios)
+        self.dias_semana = dias_semana
+        self.fuso = timezone(fuso)
+
+    def primeiro(self, agora: datetime) -> datetime:
+        return self.proximo(agora, agora)
+
+    def proximo(self, anterior: datetime, agora: datetime) -> datetime:
+        base = max(anterior, agora).astimezone(self.fuso)
+        dia = base.date()
+        while True:
+            if self.dias_semana is None or dia.weekday() in self.dias_semana:
+                for hora in self.horarios:
+                    disparo = self.fuso.localize(datetime.combine(dia, hora))
+                    if disparo > base:
+                        return disparo
+            dia += timedelta(days=1)
+
+    def __str__(self):
+        horarios = ", ".join(h.strftime("%H:%M") for h in self.horarios)
+        if self.dias_semana is None:
+            return f"diário {horarios}"
+        dias = "/".join(["seg", "ter", "qua", "qui", "sex", "sáb", "dom"][d] for d in sorted(self.dias_semana))
+        return f"{dias} {horarios}"
+
+
+# --- Motor ---
+
+class Job:
+    def __init__(self, nome: str, gatilho, func, dono: str | None, tolerancia: timedelta):
+        self.nome = nome
+        self.gatilho = gatilho
+        self.func = func
+        self.dono = dono
+        self.tolerancia = tolerancia
+        self.proxima = None
+        self.ultimo_sucesso = None
+        self.ultima_execucao = None
+        self.ultima_duracao = None
+        self.ultimo_erro = None
+        self.execucoes = 0
+        self.em_execucao = False
+        self.metrica = MetricaExecucao()
+
+    @property
+    def chave(self) -> str:
+        return f"job:{self.nome}"
+
+
+class MotorJobs:
+    def __init__(self):
+        self.jobs = {}
+        self._bot = None
+
+    def vincular(self, bot):
+        """Os jobs só executam depois que o bot estiver pronto."""
+        self._bot = bot
+        self.registrar("motor.metricas", Intervalo(minutos=INTERVALO_METRICAS, imediato=False), self.gravar_metricas)
+
+    def _estado(self) -> dict:
+        return store.carregar(JOBS_FILE, {})
+
+    def registrar(self, nome: str, gatilho, func, dono: str | None = None,
+                  tolerancia: timedelta = TOLERANCIA_PADRAO) -> Job:
+        """
+        Registra (ou substitui) o job `nome`; `func` é uma corrotina sem argumentos.
+        Um disparo perdido há no máximo `tolerancia` é executado imediatamente.
+        """
+        anterior = self.jobs.get(nome)
+        if anterior is not None:
+            agendador.cancelar(anterior.chave)
+        job = Job(nome, gatilho, func, dono, tolerancia)
+        if anterior is not None:
+            job.metrica = anterior.metrica  # Recarregar o cog não zera a telemetria
+        self.jobs[nome] = job
+
+        agora = datetime.now(UTC)
+        ultimo = self._estado().get(nome, {}).get("ultimo_sucesso")
+        if ultimo:
+            job.ultimo_sucesso = datetime.fromisoformat(ultimo)
+            # Disparo mais recente que deveria ter acontecido desde o último sucesso
+            perdido = None
+            previsto = gatilho.proximo(job.ultimo_sucesso, job.ultimo_sucesso)
+            while previsto <= agora:
+                perdido = previsto
+                previsto = gatilho.proximo(previsto, previsto)
+            if perdido is not None and agora - perdido <= tolerancia:
+                logger.info(f"⏪ Job '{nome}' perdeu o disparo de {perdido.isoformat()}; executando agora")
+                self._agendar(job, agora)
+                return job
+        self._agendar(job, gatilho.primeiro(agora))
+        return job
+
+    def remover(self, nome: str) -> bool:
+        job = self.jobs.pop(nome, None)
+        if job is None:
+            return False
+        agendador.cancelar(job.chave)
+        return True
+
+    def remover_do_dono(self, dono: str) -> int:
+        nomes = [nome for nome, job in self.jobs.items() if job.dono == dono]
+        for nome in nomes:
+            self.remover(nome)
+        if nomes:
+            logger.info(f"⏹️ {len(nomes)} job(s) de '{dono}' removido(s)")
+        return len(nomes)
+
+    def listar(self) -> list:
+        """Jobs em ordem de próximo disparo."""
+        return sorted(self.jobs.values(), key=lambda j: j.proxima or datetime.max.replace(tzinfo=UTC))
+
+    def _agendar(self, job: Job, quando: datetime):
+        job.proxima = quando
+        agendador.agendar(job.chave, quando, partial(self._disparar, job))
+
+    async def _disparar(self, job: Job):
+        if self.jobs.get(job.nome) is not job:
+            return  # Substituído ou removido enquanto o prazo corria
+        agora = datetime.now(UTC)
+        previsto = job.proxima
+        # O próximo disparo é agendado antes de executar para não acumular atraso
+        self._agendar(job, job.gatilho.proximo(previsto, agora))
+
+        if job.em_execucao:
+            job.metrica.registrar_overrun()
+            logger.warning(f"⏭️ Job '{job.nome}' ainda em execução; disparo ignorado (overrun)")
+            return
+
+        job.em_execucao = True
+        inicio = time.perf_counter()
+        erro = False
+        atraso = 0.0
+        try:
+            if self._bot is not None and not self._bot.is_ready():
+                await self._bot.wait_until_ready()
+                inicio = time.perf_counter()
+            # Atraso de início: do horário previsto até a execução começar de fato
+            atraso = max(0.0, (datetime.now(UTC) - previsto).total_seconds())
+            await job.func()
+            job.ultimo_erro = None
+            self._registrar_sucesso(job, agora)
+        except Exception as e:
+            erro = True
+            job.ultimo_erro = str(e)
+            logger.error(f"💥 Erro no job '{job.nome}': {e}")
+        finally:
+            job.em_execucao = False
+            job.execucoes += 1
+            job.ultima_duracao = time.perf_counter() - inicio
+            job.ultima_execucao = agora
+            job.metrica.registrar(atraso, job.ultima_duracao, erro)
+
+    def metricas(self) -> dict:
+        """Telemetria dos jobs e dos grupos de prazos do agendador."""
+        return {
+            "gerado_em": datetime.now(UTC).isoformat(),
+            "jobs": {job.nome: job.metrica.como_dict() for job in self.listar()},
+            # Os disparos dos próprios jobs (grupo "job") já aparecem acima, por job
+            "prazos": {grupo: m.como_dict() for grupo, m in agendador.metricas.items() if grupo != "job"},
+        }
+
+    async def gravar_metricas(self):
+        await io_pool.executar("jobs.metricas", gravar_json, METRICAS_FILE, self.metricas())
+
+    def _registrar_sucesso(self, job: Job, quando: datetime):
+        job.ultimo_sucesso = quando
+        self._estado()[job.nome] = {"ultimo_sucesso": quando.isoformat()}
+        store.marcar_sujo(JOBS_FILE)
+
+
+# Instância única usada por todos os cogs
+motor = MotorJobs()
+
+__all__ = ['MotorJobs', 'Job', 'Intervalo', 'Horario', 'motor', 'TOLERANCIA_PADRAO', 'METRICAS_FILE']
@@ -5,6 +5,12 @@ import io
 import logging
 from discord.ext import commands
 from config import TOKEN # Certifique-se de que TOKEN está definido em config.py
+from cogs.store import store
+from cogs import io_pool
+from cogs.agendador import agendador
+from cogs.jobs import motor
+from cogs.despachante_dm import despachante
+from cogs.editor_mensagens import editor
 import time
 import asyncio
 
@@ -46,7 +52,20 @@ class MyBot(commands.Bot):
         ]
 
     async def setup_hook(self):
+        motor.vincular(self)
+        despachante.vincular(self)
+        # Banco e migração inicial fora do event loop; os cogs já encontram tudo em memória
+        await io_pool.executar("store.abrir", store.abrir)
         await self.load_extensions()
+
+    async def close(self):
+        # Edições de painéis ainda na janela de agrupamento saem antes de desconectar
+        await editor.descarregar()
+        agendador.parar()
+        # Grava o que ainda estiver pendente no store antes de desconectar
+        await store.flush()
+        await super().close()
+        io_pool.desligar()
         
     async def load_extensions(self):
         for cog in self._my_cogs:
@@ -0,0 +1,111 @@
+# cogs/migracao.py
+"""
+Importação e exportação do estado do bot no formato JSON antigo (data/*.json).
+
+Uso (com o bot parado):
+    python -m cogs.migracao importar [diretorio]
+    python -m cogs.migracao exportar [diretorio]
+"""
+
+import json
+import logging
+import os
+import sys
+from datetime import datetime
+
+from .db import Database, DB_FILE
+from . import historico_missoes, raid_journal
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = "data"
+PARTICIPANTES = "participantes"
+META_MIGRACAO = "migracao_json"
+
+
+def _ops_participantes(db: Database, estado: dict) -> list:
+    """Converte o participantes.json antigo em snapshot de raid_inscricoes (journal vazio)."""
+    participantes = {
+        raid: {hora: [str(u) for u in usuarios] for hora, usuarios in horarios.items()}
+        for raid, horarios in estado.get("participantes", {}).items()
+    }
+    ops = raid_journal.ops_compactacao(participantes)
+    if "raids_config" in estado:
+        ops.append(db.op_gravar_documento("raids_config", json.dumps(estado["raids_config"], ensure_ascii=False)))
+    return ops
+
+
+def importar_json(db: Database, diretorio: str = DATA_DIR) -> int:
+    """Importa todos os data/*.json para o banco em uma única transação."""
+    ops = []
+    if os.path.isdir(diretorio):
+        for arquivo in sorted(os.listdir(diretorio)):
+            nome, ext = os.path.splitext(arquivo)
+            if ext != ".json":
+                continue
+            caminho = os.path.join(diretorio, arquivo)
+            try:
+                with open(caminho, "r", encoding="utf-8") as f:
+                    dados = json.load(f)
+            except (json.JSONDecodeError, IOError) as e:
+                logger.error(f"❌ Ignorando {caminho} na importação: {e}")
+                continue
+            if nome == PARTICIPANTES:
+                ops.extend(_ops_participantes(db, dados))
+            elif nome == historico_missoes.DOCUMENTO_LEGADO:
+                ops.extend(historico_missoes.ops_importar(dados))
+            else:
+                ops.append(db.op_gravar_documento(nome, json.dumps(dados, ensure_ascii=False)))
+    ops.append(db.op_gravar_meta(META_MIGRACAO, datetime.now().isoformat()))
+    db.executar_lote(ops)
+    logger.info(f"📥 {len(ops) - 1} registro(s) importado(s) de {diretorio} para o banco")
+    return len(ops) - 1
+
+
+def exportar_json(db: Database, diretorio: str = DATA_DIR) -> int:
+    """Escreve cada documento do banco como <nome>.json, no formato antigo."""
+    os.makedirs(diretorio, exist_ok=True)
+    total = 0
+    for nome, conteudo in db.consultar("SELECT nome, conteudo FROM documentos"):
+        with open(os.path.join(diretorio, f"{nome}.json"), "w", encoding="utf-8") as f:
+            json.dump(json.loads(conteudo), f, indent=4, ensure_ascii=False)
+        total += 1
+
+    with open(os.path.join(diretorio, f"{historico_missoes.DOCUMENTO_LEGADO}.json"), "w", encoding="utf-8") as f:
+        json.dump(historico_missoes.exportar(db), f, indent=4, ensure_ascii=False)
+    total += 1
+
+    participantes = {}
+    raid_journal.carregar_roster(db, participantes)
+    raids_config = db.ler_documento("raids_config")
+    estado = {
+        "participantes": participantes,
+        "raids_config": json.loads(raids_config) if raids_config else {},
+    }
+    with open(os.path.join(diretorio, f"{PARTICIPANTES}.json"), "w", encoding="utf-8") as f:
+        json.dump(estado, f, indent=4, ensure_ascii=False)
+    total += 1
+
+    logger.info(f"📤 {total} arquivo(s) exportado(s) para {diretorio}")
+    return total
+
+
+def main(argv):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    if not argv or argv[0] not in ("importar", "exportar"):
+        print(__doc__)
+        return 1
+    diretorio = argv[1] if len(argv) > 1 else DATA_DIR
+    db = Database(DB_FILE)
+    try:
+        if argv[0] == "importar":
+            importar_json(db, diretorio)
+        else:
+            exportar_json(db, diretorio)
+    finally:
+        db.fechar()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
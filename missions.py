@@ -1,11 +1,16 @@
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
 from discord import app_commands
-from discord.ui import View, Button, Modal, TextInput, Select
-import json
+from discord.ui import View, Button, Modal, TextInput, Select, DynamicItem
 import os
+import re
 from datetime import datetime, timedelta
 
+from .store import store
+from .historico_missoes import HistoricoMissoes
+from .agendador import agendador
+from .editor_mensagens import editor
+
 # --- INÍCIO: Funções de Utils movidas para dentro do Cog ---
 # Isso torna o cog autossuficiente e evita erros de importação.
 
@@ -15,20 +20,20 @@ os.makedirs(DATA_DIR, exist_ok=True)
 CONFIG_FILE = os.path.join(DATA_DIR, "config.json")
 MISSIONS_FILE = os.path.join(DATA_DIR, "missions.json")
 RANKING_FILE = os.path.join(DATA_DIR, "ranking.json")
-HISTORICO_FILE = os.path.join(DATA_DIR, "historico.json")
+HISTORICO_FILE = os.path.join(DATA_DIR, "historico.json")  # Formato antigo; o histórico agora é append-only no banco
+
+# Documentos do cog, gravados individualmente conforme mudam
+DOCUMENTOS = {
+    "config": CONFIG_FILE,
+    "missions": MISSIONS_FILE,
+    "ranking": RANKING_FILE,
+}
 
 def load_json(path, default):
-    if os.path.exists(path):
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except (json.JSONDecodeError, IOError):
-            return default
-    return default
+    return store.carregar(path, default)
 
 def save_json(path, data):
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
+    store.definir(path, data)
 
 # --- FIM: Funções de Utils ---
 
@@ -102,15 +107,23 @@ class MissaoControlView(View):
         finalizar_btn.callback = finalizar_callback
         self.add_item(finalizar_btn)
 
+class ParticiparButton(DynamicItem[Button], template=r"participar_(?P<missao_id>[0-9]+)"):
+    """Botão de uma missão ativa; o ID da missão vem do custom_id, então um único registro atende todas."""
+    def __init__(self, missao_id: str):
+        super().__init__(Button(label="Participar", style=discord.ButtonStyle.success, custom_id=f"participar_{missao_id}"))
+        self.missao_id = missao_id
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: Button, match: re.Match):
+        return cls(match["missao_id"])
+
+    async def callback(self, interaction: discord.Interaction):
+        await interaction.client.get_cog("MissoesCog").participar_missao(interaction, self.missao_id)
+
 class MissaoAtivaView(View):
-    def __init__(self, missao_id: str, cog):
+    def __init__(self, missao_id: str):
         super().__init__(timeout=None)
-        self.cog = cog
-        participar_btn = Button(label="Participar", style=discord.ButtonStyle.success, custom_id=f"participar_{missao_id}")
-        async def participar_callback(interaction: discord.Interaction):
-            await self.cog.participar_missao(interaction, missao_id)
-        participar_btn.callback = participar_callback
-        self.add_item(participar_btn)
+        self.add_item(ParticiparButton(missao_id))
 
 # --- COG PRINCIPAL DO BOT ---
 class MissoesCog(commands.Cog, name="MissoesCog"):
@@ -120,40 +133,47 @@ class MissoesCog(commands.Cog, name="MissoesCog"):
         self.missions = load_json(MISSIONS_FILE, {})
         self.missions.setdefault("ativas", {})  # ← ESSA LINHA É ESSENCIAL
         self.ranking = load_json(RANKING_FILE, {})
-        self.historico = load_json(HISTORICO_FILE, [])
+        self.historico_store = HistoricoMissoes(store)
+        self.historico_store.carregar()
 
         # As views de paginação agora são atributos do próprio cog
         self.ranking_paginator = Paginator(self._update_ranking_embed, "ranking")
         self.historico_paginator = Paginator(self._update_historico_embed, "historico")
         
-        self.check_expired_missions.start()
+        # Cada missão ativa expira no horário exato registrado no agendador
+        for missao_id in self.missions["ativas"]:
+            self._agendar_expiracao(missao_id)
 
     def cog_unload(self):
-        self.check_expired_missions.cancel()
-
-    def save_all_data(self):
-        save_json(CONFIG_FILE, self.config); save_json(MISSIONS_FILE, self.missions); save_json(RANKING_FILE, self.ranking); save_json(HISTORICO_FILE, self.historico)
-
-    @tasks.loop(minutes=1)
-    async def check_expired_missions(self):
-        now = datetime.now()
-        for missao_id, data in list(self.missions.get("ativas", {}).items()):
-            end_time_str = data.get("end_time")
-            if end_time_str:
-                end_time = datetime.fromisoformat(end_time_str)
-                if now >= end_time:
-                    print(f"Missão '{data['nome']}' expirou. Finalizando automaticamente.")
-                    await self.finalizar_missao(missao_id, "Finalizada (Automático)")
-
-    @check_expired_missions.before_loop
-    async def before_check_expired(self):
+        agendador.cancelar_prefixo("missao:")
+        self.bot.remove_dynamic_items(ParticiparButton)
+
+    def save_data(self, *documentos: str):
+        """Marca como sujos apenas os documentos alterados; o store agrupa as gravações."""
+        for doc in documentos:
+            store.marcar_sujo(DOCUMENTOS[doc])
+
+    def _agendar_expiracao(self, missao_id: str):
+        end_time_str = self.missions["ativas"][missao_id].get("end_time")
+        if end_time_str:
+            agendador.agendar(
+                f"missao:{missao_id}",
+                datetime.fromisoformat(end_time_str),
+                lambda: self._expirar_missao(missao_id)
+            )
+
+    async def _expirar_missao(self, missao_id: str):
         await self.bot.wait_until_ready()
+        data = self.missions["ativas"].get(missao_id)
+        if data:
+            print(f"Missão '{data['nome']}' expirou. Finalizando automaticamente.")
+            await self.finalizar_missao(missao_id, "Finalizada (Automático)")
 
     # --- COMANDOS DE CONFIGURAÇÃO ---
     
     async def _fixar_canal(self, interaction: discord.Interaction, tipo_canal: str, canal: discord.TextChannel):
         self.config[f"canal_{tipo_canal}"] = canal.id
-        self.save_all_data()
+        self.save_data("config")
         await interaction.response.send_message(f"Canal de `{tipo_canal}` fixado em {canal.mention}!", ephemeral=True)
 
     @app_commands.command(name="fixar_missao", description="Define o canal para o painel e embeds de missões.")
@@ -226,11 +246,12 @@ class MissoesCog(commands.Cog, name="MissoesCog"):
         }
         
         embed = self.build_mission_embed(missao_id)
-        view = MissaoAtivaView(missao_id, self)
+        view = MissaoAtivaView(missao_id)
         
         msg = await canal.send(embed=embed, view=view)
         self.missions["ativas"][missao_id]["msg_id"] = msg.id
-        self.save_all_data()
+        self.save_data("missions")
+        self._agendar_expiracao(missao_id)
 
         await interaction.followup.send(f"Missão '{nome}' criada com sucesso em {canal.mention}!", ephemeral=True)
 
@@ -243,12 +264,15 @@ class MissoesCog(commands.Cog, name="MissoesCog"):
         if user_id in missao["participantes"]:
             return await interaction.response.send_message("Você já está participando desta missão.", ephemeral=True)
 
+        await interaction.response.defer()
         missao["participantes"].append(user_id)
-        self.save_all_data()
+        self.save_data("missions")
 
-        # Atualiza o embed da missão
-        embed = self.build_mission_embed(missao_id)
-        await interaction.response.edit_message(embed=embed)
+        # Atualiza o embed da missão (edições agrupadas; a missão pode ter acabado até lá)
+        editor.agendar(
+            interaction.message,
+            lambda: {"embed": self.build_mission_embed(missao_id)} if missao_id in self.missions["ativas"] else None
+        )
 
     def build_mission_embed(self, missao_id: str):
         data = self.missions["ativas"][missao_id]
@@ -296,6 +320,7 @@ class MissoesCog(commands.Cog, name="MissoesCog"):
     async def finalizar_missao(self, missao_id: str, status: str):
         missao = self.missions["ativas"].pop(missao_id, None)
         if not missao: return
+        agendador.cancelar(f"missao:{missao_id}")
 
         # Apaga o embed da missão ativa
         try:
@@ -323,9 +348,9 @@ class MissoesCog(commands.Cog, name="MissoesCog"):
             "participantes": participantes, "xp_distribuido": xp_por_player,
             "status": status, "timestamp": datetime.now().isoformat()
         }
-        self.historico.insert(0, missao_historico) # Insere no início (mais recente)
+        self.historico_store.acrescentar(missao_historico) # O(1): fim do log, lido de trás para frente
         
-        self.save_all_data()
+        self.save_data("missions", *(("ranking",) if xp_por_player > 0 else ()))
 
         # Atualiza os painéis fixos
         await self._update_ranking_embed(None, 0)
@@ -333,6 +358,22 @@ class MissoesCog(commands.Cog, name="MissoesCog"):
 
     # --- COMANDOS E LÓGICA DE RANKING E HISTÓRICO ---
 
+    async def _editar_painel(self, interaction: discord.Interaction | None, canal, chave_config: str, conteudo: dict):
+        """Agenda a edição de um painel fixo; pedidos próximos viram uma única edição com o conteúdo mais novo."""
+        if interaction:
+            await interaction.response.defer()
+            msg = interaction.message
+        else: # Atualização automática
+            msg_id = self.config.get(chave_config)
+            if not msg_id: return
+            msg = canal.get_partial_message(msg_id)
+
+        def ao_sumir():
+            if self.config.get(chave_config) == msg.id:
+                self.config[chave_config] = None; self.save_data("config")
+
+        editor.agendar(msg, lambda: conteudo, ao_sumir)
+
     async def _update_ranking_embed(self, interaction: discord.Interaction | None, page: int = 0):
         canal_id = self.config.get("canal_ranking")
         if not canal_id: return
@@ -365,17 +406,7 @@ class MissoesCog(commands.Cog, name="MissoesCog"):
 
         view = self.ranking_paginator
         view.set_page_info(page, total_pages)
-
-        if interaction:
-            await interaction.response.edit_message(embed=embed, view=view)
-        else: # Atualização automática
-            msg_id = self.config.get("ranking_embed_id")
-            if msg_id:
-                try:
-                    msg = await canal.fetch_message(msg_id)
-                    await msg.edit(embed=embed, view=view)
-                except discord.NotFound:
-                    self.config["ranking_embed_id"] = None; self.save_all_data()
+        await self._editar_painel(interaction, canal, "ranking_embed_id", {"embed": embed, "view": view})
 
     @app_commands.command(name="ranking", description="Cria o painel fixo e persistente de ranking.")
     @app_commands.checks.has_permissions(administrator=True)
@@ -389,7 +420,7 @@ class MissoesCog(commands.Cog, name="MissoesCog"):
         
         msg = await canal.send(embed=embed, view=view)
         self.config["ranking_embed_id"] = msg.id
-        self.save_all_data()
+        self.save_data("config")
         
         await self._update_ranking_embed(None, 0)
         await interaction.response.send_message(f"Painel de ranking criado em {canal.mention}!", ephemeral=True)
@@ -401,12 +432,10 @@ class MissoesCog(commands.Cog, name="MissoesCog"):
         if not canal: return
 
         pag_size = 5
-        total_pages = max(1, (len(self.historico) + pag_size - 1) // pag_size)
+        total_pages = self.historico_store.total_paginas(pag_size)
         page = max(0, min(page, total_pages - 1))
         
-        start_index = page * pag_size
-        end_index = start_index + pag_size
-        page_items = self.historico[start_index:end_index]
+        page_items = await self.historico_store.pagina(page, pag_size)
 
         embed = discord.Embed(title="📜 Histórico de Missões", color=discord.Color.gold())
         if not page_items:
@@ -428,17 +457,7 @@ class MissoesCog(commands.Cog, name="MissoesCog"):
 
         view = self.historico_paginator
         view.set_page_info(page, total_pages)
-
-        if interaction:
-            await interaction.response.edit_message(embed=embed, view=view)
-        else:
-            msg_id = self.config.get("historico_embed_id")
-            if msg_id:
-                try:
-                    msg = await canal.fetch_message(msg_id)
-                    await msg.edit(embed=embed, view=view)
-                except discord.NotFound:
-                    self.config["historico_embed_id"] = None; self.save_all_data()
+        await self._editar_painel(interaction, canal, "historico_embed_id", {"embed": embed, "view": view})
 
     @app_commands.command(name="historico", description="Cria o painel fixo e persistente de histórico.")
     @app_commands.checks.has_permissions(administrator=True)
@@ -452,7 +471,7 @@ class MissoesCog(commands.Cog, name="MissoesCog"):
         
         msg = await canal.send(embed=embed, view=view)
         self.config["historico_embed_id"] = msg.id
-        self.save_all_data()
+        self.save_data("config")
         
         await self._update_historico_embed(None, 0)
         await interaction.response.send_message(f"Painel de histórico criado em {canal.mention}!", ephemeral=True)
@@ -470,10 +489,8 @@ class ViewManager(commands.Cog, name="ViewManager"):
         self.bot.add_view(self.ranking_paginator)
         self.bot.add_view(self.historico_paginator)
         self.bot.add_view(MissaoControlView(missoes_cog))
-
-        missions = load_json(MISSIONS_FILE, {"ativas": {}})
-        for missao_id in missions["ativas"]:
-            self.bot.add_view(MissaoAtivaView(missao_id, missoes_cog))
+        # Um único registro atende os botões de todas as missões ativas
+        self.bot.add_dynamic_items(ParticiparButton)
 
         config = load_json(CONFIG_FILE, {})
         if config.get("ranking_embed_id") and config.get("canal_ranking"):
@@ -0,0 +1,77 @@
+# cogs/raid_journal.py
+"""
+Journal append-only das inscrições de raid.
+
+Cada clique vira uma única linha em raid_journal (inscrever/retirar/resetar),
+com custo constante. Na inicialização o roster é o snapshot de
+raid_inscricoes mais o replay do journal; a compactação reescreve o snapshot
+e esvazia o journal na mesma transação, então uma queda no meio da gravação
+nunca deixa o roster pela metade.
+"""
+
+import time
+
+INSCREVER = "inscrever"
+RETIRAR = "retirar"
+RESETAR = "resetar"
+
+LIMITE_JOURNAL = 500  # Entradas acumuladas que disparam uma compactação
+
+
+def op_registrar(op: str, raid: str | None = None, usuario: str | None = None, hora: str | None = None):
+    return (
+        "INSERT INTO raid_journal (op, raid, usuario, hora, criado_em) VALUES (?, ?, ?, ?, ?)",
+        (op, raid, usuario, hora, time.time()),
+    )
+
+
+def aplicar(participantes: dict, op: str, raid: str | None, usuario: str | None, hora: str | None):
+    """Aplica uma entrada do journal ao roster em memória ({raid: {hora: [usuarios]}})."""
+    if op == RESETAR:
+        for r in ([raid] if raid else list(participantes)):
+            for lista in participantes.get(r, {}).values():
+                lista.clear()
+        return
+    horarios = participantes.setdefault(raid, {})
+    for lista in horarios.values():
+        if usuario in lista:
+            lista.remove(usuario)
+    if op == INSCREVER:
+        horarios.setdefault(hora, []).append(usuario)
+
+
+def carregar_roster(db, participantes: dict) -> int:
+    """
+    Preenche o roster com o snapshot + replay do journal e retorna o nº de
+    entradas repetidas. `db` pode ser o Database ou o store (ambos expõem consultar).
+    """
+    for raid, usuario, hora in db.consultar(
+        "SELECT raid, usuario, hora FROM raid_inscricoes ORDER BY inscrito_em"
+    ):
+        participantes.setdefault(raid, {}).setdefault(hora, []).append(usuario)
+    entradas = db.consultar("SELECT op, raid, usuario, hora FROM raid_journal ORDER BY seq")
+    for op, raid, usuario, hora in entradas:
+        aplicar(participantes, op, raid, usuario, hora)
+    return len(entradas)
+
+
+def ops_compactacao(participantes: dict) -> list:
+    """Operações que gravam o roster atual como snapshot e esvaziam o journal."""
+    ops = [("DELETE FROM raid_inscricoes", ())]
+    ordem = 0
+    for raid, horarios in participantes.items():
+        for hora, usuarios in horarios.items():
+            for usuario in usuarios:
+                ordem += 1
+                ops.append((
+                    "INSERT OR REPLACE INTO raid_inscricoes (raid, usuario, hora, inscrito_em) VALUES (?, ?, ?, ?)",
+                    (raid, usuario, hora, ordem),
+                ))
+    ops.append(("DELETE FROM raid_journal", ()))
+    return ops
+
+
+__all__ = [
+    'INSCREVER', 'RETIRAR', 'RESETAR', 'LIMITE_JOURNAL',
+    'op_registrar', 'aplicar', 'carregar_roster', 'ops_compactacao',
+]
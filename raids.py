@@ -1,20 +1,27 @@
 import discord
-from discord.ext import commands, tasks
-from discord.ui import View, Button, Select
+from discord.ext import commands
+from discord.ui import View, Button, Select, DynamicItem
 from discord import app_commands
-import json
-import os
 from datetime import datetime
 import locale
 import logging
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.triggers.cron import CronTrigger
 from pytz import timezone
 
 import asyncio
-from datetime import datetime
+import re
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from datetime import datetime, timedelta
+from functools import partial
 
 from . import utils
+from .store import store
+from . import raid_journal
+from .agendador import agendador
+from .jobs import motor, Horario, Intervalo
+from .despachante_dm import despachante
+from .editor_mensagens import editor
+from .telemetria import metrica_trava
 
 LOCAL_TZ = timezone('America/Sao_Paulo')  # Ajuste conforme seu fuso horário
 logger = logging.getLogger(__name__)
@@ -102,120 +109,325 @@ RAIDS = {
 }
 
 HORARIOS = [f"{h:02d}:00" for h in range(0, 24, 2)]
+# Inscritos por horário, em ordem de inscrição: {raid: {hora: [user_id (str)]}}
 participantes = {raid: {hora: [] for hora in HORARIOS} for raid in RAIDS}
+# Índice inverso {raid: {user_id: hora}}; cada usuário ocupa no máximo um horário por raid
+horario_do_usuario = {raid: {} for raid in RAIDS}
 
-PARTICIPANTES_FILE = "data/participantes.json"
+RAIDS_CONFIG_FILE = "data/raids_config.json"
+_estado_carregado = False
+_entradas_journal = 0
 
-def salvar_estado():
-    """Salva o estado dos participantes e configurações de canal das raids."""
-    estado = {
-        "participantes": participantes,
-        "raids_config": {raid: {"canal_id": info["canal_id"]} for raid, info in RAIDS.items()}
+ANTECEDENCIA_LEMBRETE = timedelta(minutes=15)
+LIMITE_HISTORICO_QUADROS = 100  # Mensagens lidas por canal ao conferir os quadros na inicialização (uma requisição)
+_tratador_lembrete = None  # Corrotina (raid, hora) registrada pelo cog Tasks
+
+# Uma trava por raid: mudanças no roster, journal e quadro de uma raid são serializadas,
+# enquanto raids diferentes seguem em paralelo
+_travas = {}
+
+# Aparência de cada raid no quadro
+ESTILO_RAIDS = {
+    "OLLUN DEKIA 2": {
+        "color": 0x3498db,
+        "emoji": "🌊",
+        "thumbnail": "https://cdn-icons-png.flaticon.com/128/3548/3548884.png"
+    },
+    "SANTUARIO NORMAL": {
+        "color": 0x2ecc71,
+        "emoji": "🏛️",
+        "thumbnail": "https://cdn-icons-png.flaticon.com/128/3548/3548876.png"
+    },
+    "SANTUARIO DESAFIO": {
+        "color": 0xe74c3c,
+        "emoji": "⚔️",
+        "thumbnail": "https://cdn-icons-png.flaticon.com/128/3549/3549884.png"
+    },
+    "GRAND PIX": {
+        "color": 0xf1c40f,
+        "emoji": "🏇",
+        "thumbnail": "https://cdn-icons-png.flaticon.com/128/539/539856.png"
+    },
+    "DG'S EM GERAL": {
+        "color": 0x9b59b6,
+        "emoji": "🏰",
+        "thumbnail": "https://cdn-icons-png.flaticon.com/128/3549/3549871.png"
     }
+}
+ESTILO_PADRAO = {
+    "color": 0x3498db,
+    "emoji": "🎮",
+    "thumbnail": "https://i.imgur.com/JL1SfQj.png"
+}
+
+def _agrupar_horarios(qtd_grupos: int = 3) -> list:
+    """Divide HORARIOS em grupos para melhor visualização; o resto vai para o último grupo."""
+    tamanho_grupo = len(HORARIOS) // qtd_grupos
+    grupos = [HORARIOS[i*tamanho_grupo:(i+1)*tamanho_grupo] for i in range(qtd_grupos)]
+    resto = len(HORARIOS) % qtd_grupos
+    if resto:
+        grupos[-1].extend(HORARIOS[-resto:])
+    return grupos
+
+GRUPOS_HORARIOS = _agrupar_horarios()
+GRUPO_DO_HORARIO = {hora: i for i, grupo in enumerate(GRUPOS_HORARIOS) for hora in grupo}
+
+# Cache de renderização dos quadros, invalidado a cada mudança no roster.
+# Só o campo do grupo (e a opção do select) do horário alterado é refeito.
+versao_roster = {raid: 0 for raid in RAIDS}
+_campos_cache = {raid: {} for raid in RAIDS}   # {raid: {guild_id: [valor do campo | None]}}
+_embeds_cache = {raid: {} for raid in RAIDS}   # {raid: {guild_id: (versao, Embed)}}
+_opcoes_cache = {raid: {} for raid in RAIDS}   # {raid: {hora: SelectOption}}
+
+def salvar_estado():
+    """Marca as configurações de canal das raids para gravação."""
+    store.definir(RAIDS_CONFIG_FILE, {raid: {"canal_id": info["canal_id"]} for raid, info in RAIDS.items()})
+
+def _registrar_no_journal(op: str, raid: str | None = None, usuario: str | None = None, hora: str | None = None):
+    """Acrescenta uma operação ao journal; custo constante, independente do tamanho do roster."""
+    global _entradas_journal
+    store.enfileirar(*raid_journal.op_registrar(op, raid, usuario, hora))
+    _entradas_journal += 1
+    if _entradas_journal >= raid_journal.LIMITE_JOURNAL:
+        compactar_journal()
+
+def compactar_journal():
+    """Grava o roster atual como snapshot e esvazia o journal no próximo flush."""
+    global _entradas_journal
+    if not _entradas_journal:
+        return
+    for sql, params in raid_journal.ops_compactacao(participantes):
+        store.enfileirar(sql, params)
+    logger.info(f"🗜️ Journal das raids compactado ({_entradas_journal} entrada(s))")
+    _entradas_journal = 0
+
+def invalidar_render(raid: str | None = None, *horas: str):
+    """Descarta o que foi renderizado para os horários (ou para a raid inteira, sem horários)."""
+    for nome in ([raid] if raid else RAIDS):
+        versao_roster[nome] += 1
+        _embeds_cache[nome].clear()
+        if not horas:
+            _campos_cache[nome].clear()
+            _opcoes_cache[nome].clear()
+            continue
+        for hora in horas:
+            _opcoes_cache[nome].pop(hora, None)
+            for campos in _campos_cache[nome].values():
+                campos[GRUPO_DO_HORARIO[hora]] = None
+
+@asynccontextmanager
+async def trava_raid(raid: str):
+    """Serializa as operações de uma raid, medindo espera e tempo de posse da trava."""
+    trava = _travas.setdefault(raid, asyncio.Lock())
+    contendida = trava.locked()
+    inicio = time.perf_counter()
+    async with trava:
+        adquirida = time.perf_counter()
+        try:
+            yield
+        finally:
+            metrica_trava(raid).registrar(adquirida - inicio, time.perf_counter() - adquirida, contendida)
+
+@asynccontextmanager
+async def travas_raids(*raids: str):
+    """Trava várias raids, sempre na mesma ordem para não haver impasse."""
+    async with AsyncExitStack() as pilha:
+        for raid in sorted(set(raids)):
+            await pilha.enter_async_context(trava_raid(raid))
+        yield
+
+def _indexar_inscricoes():
+    for raid, horarios in participantes.items():
+        horario_do_usuario[raid] = {usuario: hora for hora, usuarios in horarios.items() for usuario in usuarios}
+
+def inscrever(raid: str, usuario: str, hora: str) -> str | None:
+    """Coloca o usuário no horário, saindo do anterior se houver. Retorna o horário anterior."""
+    anterior = horario_do_usuario[raid].get(usuario)
+    if anterior == hora:
+        return anterior
+    if anterior is not None:
+        participantes[raid][anterior].remove(usuario)
+    participantes[raid][hora].append(usuario)
+    horario_do_usuario[raid][usuario] = hora
+    invalidar_render(raid, *filter(None, (anterior, hora)))
+    _registrar_no_journal(raid_journal.INSCREVER, raid, usuario, hora)
+    sincronizar_lembretes(raid)
+    return anterior
+
+def retirar(raid: str, usuario: str) -> bool:
+    """Remove o usuário do horário em que estiver inscrito. Retorna se havia inscrição."""
+    hora = horario_do_usuario[raid].pop(usuario, None)
+    if hora is None:
+        return False
+    participantes[raid][hora].remove(usuario)
+    invalidar_render(raid, hora)
+    _registrar_no_journal(raid_journal.RETIRAR, raid, usuario)
+    sincronizar_lembretes(raid)
+    return True
+
+def limpar_inscricoes(raid: str | None = None):
+    """Limpa as presenças de uma raid (ou de todas) em memória e no journal."""
+    raid_journal.aplicar(participantes, raid_journal.RESETAR, raid, None, None)
+    for nome in ([raid] if raid else horario_do_usuario):
+        horario_do_usuario[nome].clear()
+    invalidar_render(raid)
+    _registrar_no_journal(raid_journal.RESETAR, raid)
+    sincronizar_lembretes(raid)
+
+def converter_nomes_legados(guilds) -> int:
+    """
+    Troca as inscrições antigas, guardadas pelo display_name, pelo ID do membro.
+    Nomes que não correspondem a nenhum membro em cache são descartados.
+    """
+    por_nome = {}
+    convertidos = 0
+    for raid, horarios in participantes.items():
+        for hora, usuarios in horarios.items():
+            for nome in [u for u in usuarios if not u.isdigit()]:
+                if not por_nome:
+                    por_nome = {m.display_name: str(m.id) for guild in guilds for m in guild.members}
+                retirar(raid, nome)
+                user_id = por_nome.get(nome)
+                if user_id and user_id not in horario_do_usuario[raid]:
+                    inscrever(raid, user_id, hora)
+                    convertidos += 1
+                else:
+                    logger.warning(f"⚠️ Inscrição antiga '{nome}' em {raid} {hora} descartada (membro não encontrado)")
+    if convertidos:
+        logger.info(f"🔁 {convertidos} inscrição(ões) antiga(s) convertida(s) para ID de usuário")
+    return convertidos
+
+def definir_tratador_lembrete(tratador):
+    """Define a corrotina (raid, hora) chamada quando um lembrete dispara."""
+    global _tratador_lembrete
+    _tratador_lembrete = tratador
+
+def proximo_lembrete(hora: str, agora: datetime | None = None) -> datetime:
+    """Próximo instante (15 minutos antes de `hora`) em que o lembrete do horário deve sair."""
+    agora = agora or datetime.now(LOCAL_TZ)
+    hora_raid = datetime.strptime(hora, "%H:%M").time()
+    dia = agora.date()
+    while True:
+        disparo = LOCAL_TZ.localize(datetime.combine(dia, hora_raid)) - ANTECEDENCIA_LEMBRETE
+        if disparo > agora:
+            return disparo
+        dia += timedelta(days=1)
+
+def sincronizar_lembretes(raid: str | None = None):
+    """Agenda o lembrete dos horários com inscritos e cancela o dos horários que ficaram vazios."""
+    for nome in ([raid] if raid else participantes):
+        for hora, usuarios in participantes[nome].items():
+            chave = f"lembrete:{nome}:{hora}"
+            if not usuarios:
+                agendador.cancelar(chave)
+            elif not agendador.agendado(chave):
+                agendador.agendar(chave, proximo_lembrete(hora), partial(_disparar_lembrete, nome, hora))
+
+async def _disparar_lembrete(raid: str, hora: str):
     try:
-        os.makedirs(os.path.dirname(PARTICIPANTES_FILE), exist_ok=True)
-        with open(PARTICIPANTES_FILE, "w", encoding="utf-8") as f:
-            json.dump(estado, f, indent=4, ensure_ascii=False)
-        logger.info("Estado das raids salvo.")
-    except Exception as e:
-        logger.error(f"Erro ao salvar estado das raids: {e}")
+        if _tratador_lembrete and participantes[raid][hora]:
+            await _tratador_lembrete(raid, hora)
+    finally:
+        # Quem continua inscrito recebe o lembrete de novo no dia seguinte
+        sincronizar_lembretes(raid)
 
 def carregar_estado_raids():
-    """Carrega o estado dos participantes e configurações de canal das raids."""
-    global participantes
-    try:
-        if os.path.exists(PARTICIPANTES_FILE):
-            with open(PARTICIPANTES_FILE, "r", encoding="utf-8") as f:
-                estado = json.load(f)
-                for raid, horarios in estado.get("participantes", {}).items():
-                    if raid in participantes:
-                        for hora, lista in horarios.items():
-                            participantes[raid][hora] = lista
-                raids_cfg = estado.get("raids_config", {})
-                for raid_name, raid_info in raids_cfg.items():
-                    if raid_name in RAIDS:
-                        RAIDS[raid_name]["canal_id"] = raid_info.get("canal_id")
-            logger.info("Estado das raids carregado.")
-        else:
-            logger.info("Arquivo de estado das raids não encontrado. Inicializando com valores padrão.")
-    except Exception as e:
-        logger.error(f"Erro ao carregar estado das raids: {e}")
-
-def criar_embed_raid(raid: str) -> discord.Embed:
-    """Cria o embed da raid com os horários e participantes."""
-    config_raids = {
-        "OLLUN DEKIA 2": {
-            "color": 0x3498db,
-            "emoji": "🌊",
-            "thumbnail": "https://cdn-icons-png.flaticon.com/128/3548/3548884.png"
-        },
-        "SANTUARIO NORMAL": {
-            "color": 0x2ecc71,
-            "emoji": "🏛️",
-            "thumbnail": "https://cdn-icons-png.flaticon.com/128/3548/3548876.png"
-        },
-        "SANTUARIO DESAFIO": {
-            "color": 0xe74c3c,
-            "emoji": "⚔️",
-            "thumbnail": "https://cdn-icons-png.flaticon.com/128/3549/3549884.png"
-        },
-        "GRAND PIX": {
-            "color": 0xf1c40f,
-            "emoji": "🏇",
-            "thumbnail": "https://cdn-icons-png.flaticon.com/128/539/539856.png"
-        },
-        "DG'S EM GERAL": {
-            "color": 0x9b59b6,
-            "emoji": "🏰",
-            "thumbnail": "https://cdn-icons-png.flaticon.com/128/3549/3549871.png"
-        }
-    }
-    
-    config = config_raids.get(raid, {
-        "color": 0x3498db,
-        "emoji": "🎮",
-        "thumbnail": "https://i.imgur.com/JL1SfQj.png"
-    })
-    
+    """Carrega o estado dos participantes (snapshot + journal) e configurações de canal das raids."""
+    global _estado_carregado, _entradas_journal
+    if _estado_carregado:
+        # O estado em memória é a fonte da verdade após a primeira carga
+        return
+    roster = {}
+    _entradas_journal = raid_journal.carregar_roster(store, roster)
+    for raid, horarios in roster.items():
+        for hora, usuarios in horarios.items():
+            if raid in participantes and hora in participantes[raid]:
+                participantes[raid][hora].extend(usuarios)
+    _indexar_inscricoes()
+    invalidar_render()
+    raids_cfg = store.carregar(RAIDS_CONFIG_FILE, {})
+    for raid_name, raid_info in raids_cfg.items():
+        if raid_name in RAIDS:
+            RAIDS[raid_name]["canal_id"] = raid_info.get("canal_id")
+    _estado_carregado = True
+    logger.info(f"Estado das raids carregado ({_entradas_journal} entrada(s) do journal repetidas).")
+    compactar_journal()
+    sincronizar_lembretes()
+
+def _nome_exibicao(guild: discord.Guild | None, usuario: str) -> str:
+    if not usuario.isdigit():
+        return usuario  # Inscrição antiga, guardada pelo nome
+    membro = guild.get_member(int(usuario)) if guild else None
+    # Sem o membro em cache, a menção ainda aparece com o nome no Discord
+    return membro.display_name if membro else f"<@{usuario}>"
+
+def _renderizar_grupo(raid: str, guild: discord.Guild | None, grupo: list) -> str:
+    field_value = ""
+    for hora in grupo:
+        lista = participantes[raid][hora]
+        status = "🔴" if len(lista) >= 5 else "🟢" if lista else "⚪"
+        nomes = "\n".join(f"• {_nome_exibicao(guild, u)}" for u in lista) if lista else "• Vagas disponíveis"
+        field_value += f"**{hora}** {status}\n{nomes}\n\n"
+    return field_value
+
+def criar_embed_raid(raid: str, guild: discord.Guild | None = None) -> discord.Embed:
+    """
+    Embed da raid com os horários e participantes (nomes resolvidos pelo cache de membros da guild).
+    O embed retornado é compartilhado pelo cache e não deve ser alterado.
+    """
+    guild_id = guild.id if guild else None
+    versao = versao_roster[raid]
+    em_cache = _embeds_cache[raid].get(guild_id)
+    if em_cache and em_cache[0] == versao:
+        return em_cache[1]
+
+    config = ESTILO_RAIDS.get(raid, ESTILO_PADRAO)
     embed = discord.Embed(
         title=f"{config['emoji']} {raid} {config['emoji']}",
         description=RAIDS[raid]["descricao"],
         color=config["color"]
     )
-    
     embed.set_thumbnail(url=config["thumbnail"])
 
-    # Dividir HORARIOS em 3 grupos para melhor visualização
-    qtd_grupos = 3
-    tamanho_grupo = len(HORARIOS) // qtd_grupos
-    grupos_horarios = [HORARIOS[i*tamanho_grupo:(i+1)*tamanho_grupo] for i in range(qtd_grupos)]
-
-    # Caso não divida exatamente (ex: len(HORARIOS)%3 != 0), adiciona o restante no último grupo
-    resto = len(HORARIOS) % qtd_grupos
-    if resto:
-        grupos_horarios[-1].extend(HORARIOS[-resto:])
-    
-    for i, grupo in enumerate(grupos_horarios):
-        field_value = ""
-        for hora in grupo:
-            lista = participantes[raid][hora]
-            status = "🔴" if len(lista) >= 5 else "🟢" if lista else "⚪"
-            nomes = "\n".join(f"• {nome}" for nome in lista) if lista else "• Vagas disponíveis"
-            field_value += f"**{hora}** {status}\n{nomes}\n\n"
-        
+    campos = _campos_cache[raid].setdefault(guild_id, [None] * len(GRUPOS_HORARIOS))
+    for i, grupo in enumerate(GRUPOS_HORARIOS):
+        if campos[i] is None:
+            campos[i] = _renderizar_grupo(raid, guild, grupo)
         embed.add_field(
             name=f"📅 Grupo {i+1}",
-            value=field_value,
+            value=campos[i],
             inline=True
         )
-    
+
     embed.set_footer(
         text="🔧 Apenas administradores podem gerenciar raids",
         icon_url="https://cdn-icons-png.flaticon.com/128/6024/6024190.png"
     )
-    
+
+    _embeds_cache[raid][guild_id] = (versao, embed)
     return embed
 
+def opcoes_horarios(raid: str) -> list:
+    """Opções do select de horários, refeitas só para os horários que mudaram."""
+    cache = _opcoes_cache[raid]
+    opcoes = []
+    for hora in HORARIOS:
+        opcao = cache.get(hora)
+        if opcao is None:
+            opcao = cache[hora] = discord.SelectOption(
+                label=hora,
+                description=f"{len(participantes[raid][hora])}/5 participantes",
+                value=hora,
+                emoji="🕒"
+            )
+        opcoes.append(opcao)
+    return opcoes
+
+def atualizar_quadro(interaction: discord.Interaction, raid: str):
+    """Agenda a edição do quadro da raid (agrupada com os outros cliques da janela)."""
+    guild = interaction.guild
+    editor.agendar(interaction.message, lambda: {"embed": criar_embed_raid(raid, guild), "view": HorarioView(raid)})
+
 def criar_embed_confirmacao(raid: str, hora: str, user: discord.User) -> discord.Embed:
     """Embed para confirmação de inscrição do usuário na raid."""
     embed = discord.Embed(
@@ -240,25 +452,25 @@ def criar_embed_lembrete(raid: str, hora: str) -> discord.Embed:
     embed.add_field(name="Detalhes", value=RAIDS[raid]["descricao"], inline=False)
     return embed
 
-class HorarioSelect(Select):
+# Os componentes dos quadros são itens dinâmicos: um único registro por tipo atende
+# todas as raids, reconhecidas pelo nome embutido no custom_id
+_PADRAO_RAID = "(?P<raid>" + "|".join(re.escape(raid) for raid in RAIDS) + ")"
+
+class HorarioSelect(DynamicItem[Select], template=f"horario_select_{_PADRAO_RAID}"):
     def __init__(self, raid: str):
-        options = [
-            discord.SelectOption(
-                label=hora,
-                description=f"{len(participantes[raid][hora])}/5 participantes",
-                value=hora,
-                emoji="🕒"
-            ) for hora in HORARIOS
-        ]
-        super().__init__(
+        super().__init__(Select(
             placeholder="🕒 Selecione um horário...",
             min_values=1,
             max_values=1,
-            options=options,
+            options=opcoes_horarios(raid),
             custom_id=f"horario_select_{raid}"
-        )
+        ))
         self.raid = raid
 
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: Select, match: re.Match):
+        return cls(match["raid"])
+
     async def callback(self, interaction: discord.Interaction):
         if not interaction.user.guild_permissions.administrator:
             await interaction.response.send_message(
@@ -267,40 +479,35 @@ class HorarioSelect(Select):
             )
             return
         
-        hora = self.values[0]
+        hora = self.item.values[0]
         user = interaction.user
+        await interaction.response.defer()
 
-        # Remove o usuário de todos os horários
-        for h in HORARIOS:
-            if user.display_name in participantes[self.raid][h]:
-                participantes[self.raid][h].remove(user.display_name)
-        
-        # Adiciona no horário selecionado
-        participantes[self.raid][hora].append(user.display_name)
-        salvar_estado()
-
-        embed = criar_embed_raid(self.raid)
-        view = HorarioView(self.raid)
-        await interaction.response.edit_message(embed=embed, view=view)
+        # Move o usuário para o horário selecionado (sai do anterior, se houver)
+        async with trava_raid(self.raid):
+            inscrever(self.raid, str(user.id), hora)
+            atualizar_quadro(interaction, self.raid)
 
-        try:
-            await user.send(embed=criar_embed_confirmacao(self.raid, hora, user))
-        except discord.Forbidden:
+        if not await despachante.enviar(user.id, embed=criar_embed_confirmacao(self.raid, hora, user)):
             await interaction.followup.send(
                 "Não foi possível enviar a confirmação por DM. Por favor, habilite mensagens diretas.",
                 ephemeral=True
             )
 
-class WithdrawButton(Button):
+class WithdrawButton(DynamicItem[Button], template=f"withdraw_{_PADRAO_RAID}"):
     def __init__(self, raid: str):
-        super().__init__(
+        super().__init__(Button(
             label="❌ Cancelar Inscrição",
             style=discord.ButtonStyle.red,
             custom_id=f"withdraw_{raid}",
             emoji="✖️"
-        )
+        ))
         self.raid = raid
 
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: Button, match: re.Match):
+        return cls(match["raid"])
+
     async def callback(self, interaction: discord.Interaction):
         if not interaction.user.guild_permissions.administrator:
             await interaction.response.send_message(
@@ -309,39 +516,37 @@ class WithdrawButton(Button):
             )
             return
         
-        user = interaction.user
-        removido = False
-        
-        for hora in HORARIOS:
-            if user.display_name in participantes[self.raid][hora]:
-                participantes[self.raid][hora].remove(user.display_name)
-                removido = True
-        
-        if removido:
-            salvar_estado()
-            embed = criar_embed_raid(self.raid)
-            view = HorarioView(self.raid)
-            await interaction.response.edit_message(embed=embed, view=view)
+        await interaction.response.defer()
+        async with trava_raid(self.raid):
+            retirado = retirar(self.raid, str(interaction.user.id))
+            if retirado:
+                atualizar_quadro(interaction, self.raid)
+
+        if retirado:
             await interaction.followup.send(
                 "✅ Sua inscrição foi cancelada em todos os horários.",
                 ephemeral=True
             )
         else:
-            await interaction.response.send_message(
+            await interaction.followup.send(
                 "ℹ️ Você não está inscrito em nenhum horário.",
                 ephemeral=True
             )
 
-class ResetButton(Button):
+class ResetButton(DynamicItem[Button], template=f"reset_{_PADRAO_RAID}"):
     def __init__(self, raid: str):
-        super().__init__(
+        super().__init__(Button(
             label="🔄 Resetar Presenças",
             style=discord.ButtonStyle.grey,
             custom_id=f"reset_{raid}",
             emoji="🔄"
-        )
+        ))
         self.raid = raid
 
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: Button, match: re.Match):
+        return cls(match["raid"])
+
     async def callback(self, interaction: discord.Interaction):
         if not interaction.user.guild_permissions.administrator:
             await interaction.response.send_message(
@@ -350,13 +555,10 @@ class ResetButton(Button):
             )
             return
         
-        for hora in HORARIOS:
-            participantes[self.raid][hora].clear()
-        
-        salvar_estado()
-        embed = criar_embed_raid(self.raid)
-        view = HorarioView(self.raid)
-        await interaction.response.edit_message(embed=embed, view=view)
+        await interaction.response.defer()
+        async with trava_raid(self.raid):
+            limpar_inscricoes(self.raid)
+            atualizar_quadro(interaction, self.raid)
         await interaction.followup.send(
             "✅ Presenças resetadas com sucesso para todos os horários!",
             ephemeral=True
@@ -373,75 +575,142 @@ class HorarioView(View):
 class Raids(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.mensagens_eventos = {}
-        self.scheduler = None
-        self.scheduler_started = False
+        self._restaurado = False
+        # O estado precisa estar carregado antes de registrar os jobs: um reset diário
+        # perdido é recuperado assim que o bot fica pronto, antes até do on_ready do cog
+        carregar_estado_raids()
+        self.carregar_mensagens_eventos()
+        motor.registrar("raids.reset_diario", Horario(utils.RESET_HORA, fuso=LOCAL_TZ.zone), self.rollover_diario, self.qualified_name)
+        motor.registrar("raids.compactar_journal", Intervalo(minutos=15, imediato=False), self.compactar_journal_job, self.qualified_name)
+        logger.info(f"Reset diário agendado para {utils.RESET_HORA} ({LOCAL_TZ})")
+
+    def cog_unload(self):
+        motor.remover_do_dono(self.qualified_name)
+        # Os lembretes apontam para funções deste módulo; a nova carga os agenda de novo
+        agendador.cancelar_prefixo("lembrete:")
+        self.bot.remove_dynamic_items(HorarioSelect, WithdrawButton, ResetButton)
+        compactar_journal()
+
+    async def compactar_journal_job(self):
+        compactar_journal()
 
     @commands.Cog.listener()
-    async def on_ready(self):
-        if not self.scheduler_started:
-            self.scheduler = AsyncIOScheduler()
-            self.scheduler.start()
-            self.scheduler_started = True
-
-            hora, minuto = map(int, utils.RESET_HORA.split(":"))
-            self.scheduler.add_job(
-                self.reset_eventos,
-                trigger=CronTrigger(hour=hora, minute=minuto, timezone=LOCAL_TZ),
-                id="reset_diario",
-                replace_existing=True
-            )
-            logger.info(f"Scheduler iniciado - reset diário agendado para {utils.RESET_HORA} ({LOCAL_TZ})")
+    async def on_member_update(self, before, after):
+        # Apelido novo: refaz só os campos onde o membro aparece
+        if before.display_name == after.display_name:
+            return
+        for raid, inscricoes in horario_do_usuario.items():
+            hora = inscricoes.get(str(after.id))
+            if hora is not None:
+                invalidar_render(raid, hora)
 
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # on_ready se repete a cada reconexão com sessão nova; o estado e os quadros
+        # continuam válidos, então a restauração roda uma única vez por carga do cog
+        if self._restaurado:
+            return
+        self._restaurado = True
         logger.info("✅ Módulo de Raids carregado")
-        carregar_estado_raids()
-        self.carregar_mensagens_eventos()
-
-        # Registrar views persistentes
-        for raid in RAIDS:
-            self.bot.add_view(HorarioView(raid))
+        # Precisa do cache de membros, então só pode rodar com o bot pronto
+        converter_nomes_legados(self.bot.guilds)
+        await self.restaurar_quadros()
+
+    async def restaurar_quadros(self):
+        """Confere os quadros de todas as raids (um canal por tarefa, em paralelo) e republica os que sumiram."""
+        if self._quadros_legados:
+            resultados = await asyncio.gather(
+                *(self._apagar_quadro_legado(canal_id, msg_id) for canal_id, msg_id in self._quadros_legados.items()),
+                return_exceptions=True
+            )
+            for (canal_id, msg_id), resultado in zip(self._quadros_legados.items(), resultados):
+                if isinstance(resultado, Exception):
+                    logger.error(f"Erro ao apagar o quadro antigo {msg_id} do canal {canal_id}: {resultado}")
+            self._quadros_legados = {}
 
-        # Restaurar mensagens das raids configuradas
+        por_canal = {}
         for raid, info in RAIDS.items():
-            canal_id = info.get("canal_id")
-            if canal_id:
-                try:
-                    canal = self.bot.get_channel(canal_id)
-                    if not canal:
+            if info.get("canal_id"):
+                por_canal.setdefault(info["canal_id"], []).append(raid)
+
+        resultados = await asyncio.gather(
+            *(self._restaurar_canal(canal_id, raids) for canal_id, raids in por_canal.items()),
+            return_exceptions=True
+        )
+        for (canal_id, raids), resultado in zip(por_canal.items(), resultados):
+            if isinstance(resultado, Exception):
+                logger.error(f"Erro ao verificar as raids {', '.join(raids)} no canal {canal_id}: {resultado}")
+        republicados = sum(r for r in resultados if isinstance(r, int))
+        if republicados or self._migrar_mensagens:
+            self._migrar_mensagens = False
+            self.salvar_mensagens_eventos()
+        logger.info(f"🔎 Quadros das raids conferidos ({republicados} republicado(s))")
+
+    async def _restaurar_canal(self, canal_id: int, raids: list) -> int:
+        canal = self.bot.get_channel(canal_id)
+        if not canal:
+            return 0
+
+        republicados = 0
+        # A leitura fica dentro da trava: um reset diário em andamento no mesmo canal
+        # termina antes, e os quadros que ele publicou já aparecem no histórico
+        async with travas_raids(*raids):
+            # Uma leitura do histórico recente valida todos os quadros do canal
+            existentes = set()
+            mais_antiga = None
+            async for msg in canal.history(limit=LIMITE_HISTORICO_QUADROS):
+                mais_antiga = msg.id
+                if msg.author == self.bot.user:
+                    existentes.add(msg.id)
+
+            for raid in raids:
+                msg_id = self.mensagens_eventos.get(raid)
+                if msg_id in existentes:
+                    continue
+                if msg_id and mais_antiga and msg_id < mais_antiga:
+                    # Anterior à janela lida: só então vale buscar a mensagem individualmente
+                    try:
+                        await canal.fetch_message(msg_id)
                         continue
-                    msg_id = self.mensagens_eventos.get(str(canal_id))
-                    if msg_id:
-                        try:
-                            await canal.fetch_message(msg_id)
-                        except discord.NotFound:
-                            embed = criar_embed_raid(raid)
-                            view = HorarioView(raid)
-                            msg = await canal.send(embed=embed, view=view)
-                            self.mensagens_eventos[str(canal_id)] = msg.id
-                            self.salvar_mensagens_eventos()
-                    else:
-                        embed = criar_embed_raid(raid)
-                        view = HorarioView(raid)
-                        msg = await canal.send(embed=embed, view=view)
-                        self.mensagens_eventos[str(canal_id)] = msg.id
-                        self.salvar_mensagens_eventos()
-                except Exception as e:
-                    logger.error(f"Erro ao verificar mensagem da raid {raid}: {e}")
+                    except discord.NotFound:
+                        pass
+                msg = await canal.send(embed=criar_embed_raid(raid, canal.guild), view=HorarioView(raid))
+                self.mensagens_eventos[raid] = msg.id
+                republicados += 1
+        return republicados
 
     def carregar_mensagens_eventos(self):
-        try:
-            if os.path.exists(utils.MENSAGENS_EVENTOS_FILE):
-                with open(utils.MENSAGENS_EVENTOS_FILE, 'r', encoding='utf-8') as f:
-                    self.mensagens_eventos = json.load(f)
-        except Exception as e:
-            logger.error(f"Erro ao carregar mensagens de eventos: {e}")
+        """
+        Carrega {raid: msg_id}. No formato antigo ({canal_id: msg_id}, um quadro por canal)
+        a entrada vira a da raid quando só uma raid usa o canal; com várias não dá para saber
+        de qual raid é o quadro, então ele é apagado por `restaurar_quadros` antes de republicar.
+        """
+        mensagens = store.carregar(utils.MENSAGENS_EVENTOS_FILE, {})
+        self.mensagens_eventos = {raid: msg_id for raid, msg_id in mensagens.items() if raid in RAIDS}
+        self._quadros_legados = {}
+        for chave, msg_id in mensagens.items():
+            if chave in RAIDS or not chave.isdigit():
+                continue
+            raids_do_canal = [raid for raid, info in RAIDS.items() if info.get("canal_id") == int(chave)]
+            if len(raids_do_canal) == 1 and raids_do_canal[0] not in self.mensagens_eventos:
+                self.mensagens_eventos[raids_do_canal[0]] = msg_id
+            else:
+                self._quadros_legados[int(chave)] = msg_id
+        # Gravado só depois que os quadros antigos forem apagados, para não perder os IDs
+        self._migrar_mensagens = len(self.mensagens_eventos) != len(mensagens) or bool(self._quadros_legados)
 
     def salvar_mensagens_eventos(self):
+        store.definir(utils.MENSAGENS_EVENTOS_FILE, self.mensagens_eventos)
+
+    async def _apagar_quadro_legado(self, canal_id: int, msg_id: int):
+        canal = self.bot.get_channel(canal_id)
+        if not canal:
+            return
         try:
-            with open(utils.MENSAGENS_EVENTOS_FILE, 'w', encoding='utf-8') as f:
-                json.dump(self.mensagens_eventos, f, indent=4, ensure_ascii=False)
-        except Exception as e:
-            logger.error(f"Erro ao salvar mensagens de eventos: {e}")
+            await canal.get_partial_message(msg_id).delete()
+            logger.info(f"🧹 Quadro antigo {msg_id} do canal {canal_id} apagado")
+        except discord.NotFound:
+            pass
 
     async def limpar_mensagens_antigas(self, canal_id: int):
         if not utils.LIMPAR_MENSAGENS_ANTIGAS:
@@ -453,37 +722,41 @@ class Raids(commands.Cog):
         except Exception as e:
             logger.error(f"Erro ao limpar mensagens antigas: {e}")
 
-    async def reset_eventos(self):
-        logger.info("⏰ Iniciando reset diário de eventos via APScheduler...")
-
-        # Limpa todas as presenças
-        for raid in RAIDS:
-            for hora in HORARIOS:
-                participantes[raid][hora].clear()
-        salvar_estado()
-
-        canal = self.bot.get_channel(utils.CANAL_RAIDS_ID)
-        if not canal:
-            logger.error(f"Canal das raids (ID {utils.CANAL_RAIDS_ID}) não encontrado.")
-            return
-
-        # Limpa mensagens antigas do bot (se configurado)
-        if utils.LIMPAR_MENSAGENS_ANTIGAS:
-            await canal.purge(limit=50, check=lambda m: m.author == self.bot.user)
+    async def rollover_diario(self):
+        """
+        Reset diário: limpa as presenças e republica os quadros. As raids são
+        agrupadas por canal, então cada canal tem uma única limpeza seguida de
+        um envio por raid.
+        """
+        logger.info("⏰ Iniciando reset diário de eventos...")
+        async with travas_raids(*RAIDS):
+            limpar_inscricoes()
+
+        por_canal = {}
+        for raid, info in RAIDS.items():
+            if info.get("canal_id"):
+                por_canal.setdefault(info["canal_id"], []).append(raid)
 
-        # Envia as mensagens separadas, uma para cada raid, no mesmo canal
-        for raid in RAIDS:
-            embed = criar_embed_raid(raid)
-            view = HorarioView(raid)
-            msg = await canal.send(embed=embed, view=view)
-            # Armazena o ID da mensagem associada a cada raid pelo nome da raid
-            self.mensagens_eventos[raid] = msg.id
+        for canal_id, raids in por_canal.items():
+            canal = self.bot.get_channel(canal_id)
+            if not canal:
+                logger.warning(f"Canal {canal_id} das raids {', '.join(raids)} não encontrado.")
+                continue
+            try:
+                # Cliques nas raids deste canal esperam o quadro novo ser publicado
+                async with travas_raids(*raids):
+                    if utils.LIMPAR_MENSAGENS_ANTIGAS:
+                        await canal.purge(limit=50, check=lambda m: m.author == self.bot.user)
+                    for raid in raids:
+                        msg = await canal.send(embed=criar_embed_raid(raid, canal.guild), view=HorarioView(raid))
+                        self.mensagens_eventos[raid] = msg.id
+                        logger.info(f"📝 Raid {raid} atualizada")
+            except discord.HTTPException as e:
+                logger.error(f"⚠️ Erro ao republicar as raids do canal {canal_id}: {e}")
 
-        # Salva o estado das mensagens enviadas
         self.salvar_mensagens_eventos()
-
         logger.info("✅ Reset diário de eventos concluído.")
-        
+
     @app_commands.command(name="listar_config_raid", description="Lista os canais configurados para cada raid")
     async def listar_config_raid(self, interaction: discord.Interaction):
         if not interaction.user.guild_permissions.administrator:
@@ -540,11 +813,12 @@ class Raids(commands.Cog):
         RAIDS[raid.value]["canal_id"] = canal.id
         salvar_estado()
 
-        embed = criar_embed_raid(raid.value)
-        view = HorarioView(raid.value)
-        msg = await canal.send(embed=embed, view=view)
-        self.mensagens_eventos[str(canal.id)] = msg.id
-        self.salvar_mensagens_eventos()
+        async with trava_raid(raid.value):
+            embed = criar_embed_raid(raid.value, canal.guild)
+            view = HorarioView(raid.value)
+            msg = await canal.send(embed=embed, view=view)
+            self.mensagens_eventos[raid.value] = msg.id
+            self.salvar_mensagens_eventos()
 
         await interaction.followup.send(
             f"✅ Raid **{raid.value}** configurada no canal {canal.mention}",
@@ -552,4 +826,6 @@ class Raids(commands.Cog):
         )
 
 async def setup(bot):
+    # Componentes persistentes dos quadros (um registro por tipo, para todas as raids)
+    bot.add_dynamic_items(HorarioSelect, WithdrawButton, ResetButton)
     await bot.add_cog(Raids(bot))
\ No newline at end of file
@@ -0,0 +1,163 @@
+# cogs/snapshots.py
+"""
+Snapshots endereçados por conteúdo (backups do calendário).
+
+Cada conteúdo é gravado uma única vez em objetos/<sha256>.json.gz; o índice
+guarda apenas (hash, criado_em). A retenção mantém o snapshot mais recente de
+cada uma das últimas N horas, dias e semanas e apaga os objetos que deixaram
+de ser referenciados. Todos os métodos são bloqueantes: chame-os fora do
+event loop (io_pool.executar).
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+BACKUP_DIR = os.path.join("data", "backups")
+
+# Quantos períodos de cada tipo são mantidos
+RETENCAO_PADRAO = {
+    "hora": 24,
+    "dia": 7,
+    "semana": 4,
+}
+
+_DURACAO = {
+    "hora": 3600,
+    "dia": 86400,
+    "semana": 7 * 86400,
+}
+
+_LEGADO = re.compile(r"^(?P<prefixo>.+)_backup_(?P<ts>\d{8}_\d{6})\.json$")
+
+
+class SnapshotStore:
+    def __init__(self, nome: str, diretorio: str = BACKUP_DIR, retencao: dict | None = None):
+        self.nome = nome
+        self.diretorio = diretorio
+        self.dir_objetos = os.path.join(diretorio, "objetos")
+        self.arquivo_indice = os.path.join(diretorio, f"{nome}_indice.json")
+        self.retencao = retencao or dict(RETENCAO_PADRAO)
+        self._lock = threading.Lock()
+
+    # --- Índice ---
+
+    def _ler_indice(self) -> list:
+        if not os.path.exists(self.arquivo_indice):
+            return []
+        try:
+            with open(self.arquivo_indice, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            logger.error(f"Erro ao ler índice de snapshots {self.arquivo_indice}: {e}")
+            return []
+
+    def _gravar_indice(self, indice: list):
+        temporario = f"{self.arquivo_indice}.tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(indice, f, indent=4)
+        os.replace(temporario, self.arquivo_indice)
+
+    def _caminho_objeto(self, hash_: str) -> str:
+        return os.path.join(self.dir_objetos, f"{hash_}.json.gz")
+
+    def _gravar_objeto(self, conteudo: bytes) -> str:
+        hash_ = hashlib.sha256(conteudo).hexdigest()
+        caminho = self._caminho_objeto(hash_)
+        if not os.path.exists(caminho):
+            os.makedirs(self.dir_objetos, exist_ok=True)
+            temporario = f"{caminho}.tmp"
+            with gzip.open(temporario, "wb") as f:
+                f.write(conteudo)
+            os.replace(temporario, caminho)
+        return hash_
+
+    # --- API ---
+
+    def salvar(self, conteudo: bytes, criado_em: float | None = None) -> str:
+        """
+        Registra um snapshot e aplica a retenção. Retorna o hash do conteúdo.
+        Passe `criado_em` quando as chamadas podem chegar fora de ordem (pool de threads).
+        """
+        with self._lock:
+            hash_ = self._gravar_objeto(conteudo)
+            indice = self._ler_indice()
+            if indice and max(indice, key=lambda s: s["criado_em"])["hash"] == hash_:
+                # Mesmo conteúdo do snapshot mais recente: nada a registrar
+                return hash_
+            indice.append({"hash": hash_, "criado_em": time.time() if criado_em is None else criado_em})
+            indice.sort(key=lambda s: s["criado_em"])
+            indice = self._aplicar_retencao(indice)
+            self._gravar_indice(indice)
+            return hash_
+
+    def listar(self) -> list:
+        """Snapshots do mais recente para o mais antigo."""
+        with self._lock:
+            return list(reversed(self._ler_indice()))
+
+    def ler(self, hash_: str) -> bytes:
+        """Lê o conteúdo de um snapshot (aceita prefixo do hash)."""
+        with self._lock:
+            candidatos = [s["hash"] for s in self._ler_indice() if s["hash"].startswith(hash_)]
+        if len(set(candidatos)) != 1:
+            raise KeyError(hash_)
+        with gzip.open(self._caminho_objeto(candidatos[0]), "rb") as f:
+            return f.read()
+
+    def _aplicar_retencao(self, indice: list, agora: float | None = None) -> list:
+        agora = agora or time.time()
+        manter = {len(indice) - 1} if indice else set()  # O mais recente sempre fica
+        for periodo, quantidade in self.retencao.items():
+            duracao = _DURACAO[periodo]
+            vistos = set()
+            for i in range(len(indice) - 1, -1, -1):
+                balde = int(indice[i]["criado_em"] // duracao)
+                if balde in vistos or balde <= int(agora // duracao) - quantidade:
+                    continue
+                vistos.add(balde)
+                manter.add(i)
+        novo = [s for i, s in enumerate(indice) if i in manter]
+
+        # Coleta de objetos não referenciados por nenhum índice deste diretório
+        if len(novo) < len(indice):
+            referenciados = {s["hash"] for s in novo}
+            for arquivo in os.listdir(self.diretorio):
+                if arquivo.endswith("_indice.json") and arquivo != os.path.basename(self.arquivo_indice):
+                    with open(os.path.join(self.diretorio, arquivo), "r", encoding="utf-8") as f:
+                        referenciados.update(s["hash"] for s in json.load(f))
+            for s in indice:
+                if s["hash"] not in referenciados and os.path.exists(self._caminho_objeto(s["hash"])):
+                    os.remove(self._caminho_objeto(s["hash"]))
+                    referenciados.add(s["hash"])
+            logger.info(f"🧹 Retenção de snapshots '{self.nome}': {len(indice) - len(novo)} removido(s)")
+        return novo
+
+    def importar_legados(self) -> int:
+        """Converte os backups antigos <nome>_backup_AAAAMMDD_HHMMSS.json em snapshots."""
+        if not os.path.isdir(self.diretorio):
+            return 0
+        legados = []
+        for arquivo in os.listdir(self.diretorio):
+            m = _LEGADO.match(arquivo)
+            if m and m.group("prefixo") == self.nome:
+                criado_em = datetime.strptime(m.group("ts"), "%Y%m%d_%H%M%S").timestamp()
+                legados.append((criado_em, os.path.join(self.diretorio, arquivo)))
+        for criado_em, caminho in sorted(legados):
+            with open(caminho, "rb") as f:
+                self.salvar(f.read(), criado_em)
+            os.remove(caminho)
+        if legados:
+            logger.info(f"📦 {len(legados)} backup(s) antigo(s) de '{self.nome}' convertido(s) em snapshots")
+        return len(legados)
+
+
+__all__ = ['SnapshotStore', 'BACKUP_DIR', 'RETENCAO_PADRAO']
@@ -0,0 +1,156 @@
+# cogs/store.py
+
+import asyncio
+import copy
+import json
+import logging
+import os
+
+from .db import Database
+from . import io_pool, migracao
+
+logger = logging.getLogger(__name__)
+
+INTERVALO_FLUSH = 2.0  # Segundos entre gravações agrupadas no banco
+
+
+def nome_documento(caminho: str) -> str:
+    """'data/ranking.json' -> 'ranking' (nome do documento no banco)."""
+    return os.path.splitext(os.path.basename(caminho))[0]
+
+
+class StateStore:
+    """
+    Estado compartilhado entre os cogs.
+
+    Cada documento é lido do banco uma única vez e servido da memória.
+    As alterações só marcam o documento como sujo (ou enfileiram uma operação
+    de linha); tudo o que estiver pendente é gravado junto, em uma transação,
+    a cada `intervalo_flush` segundos e fora do event loop.
+    """
+
+    def __init__(self, db: Database | None = None, intervalo_flush: float = INTERVALO_FLUSH):
+        self.db = db or Database()
+        self.intervalo_flush = intervalo_flush
+        self._documentos = {}
+        self._brutos = {}  # nome -> JSON lido na abertura, ainda não usado por nenhum cog
+        self._sujos = set()
+        self._operacoes = []
+        self._preparado = False
+        self._flush_agendado = None
+        self._tarefa_flush = None
+        self._lock_gravacao = asyncio.Lock()
+
+    def abrir(self):
+        """
+        Abre o banco, importa o layout antigo de data/*.json na primeira execução
+        e lê todos os documentos. Bloqueante: o bot chama uma vez no setup_hook,
+        via io_pool, antes de carregar os cogs.
+        """
+        if self._preparado:
+            return
+        self.db.conexao()
+        if self.db.ler_meta(migracao.META_MIGRACAO) is None:
+            logger.info("📦 Banco de estado vazio, importando data/*.json...")
+            migracao.importar_json(self.db, os.path.dirname(self.db.caminho) or migracao.DATA_DIR)
+        self._brutos = dict(self.db.consultar("SELECT nome, conteudo FROM documentos"))
+        self._preparado = True
+
+    def carregar(self, caminho: str, padrao):
+        """Retorna o documento em memória (o próprio objeto, não uma cópia)."""
+        if caminho not in self._documentos:
+            self.abrir()
+            conteudo = self._brutos.pop(nome_documento(caminho), None)
+            self._documentos[caminho] = json.loads(conteudo) if conteudo is not None else copy.deepcopy(padrao)
+        return self._documentos[caminho]
+
+    def consultar(self, sql: str, params=()) -> list:
+        """Leitura direta no banco, para tabelas que não são documentos."""
+        self.abrir()
+        return self.db.consultar(sql, params)
+
+    def definir(self, caminho: str, dados):
+        """Substitui o documento em memória e agenda sua gravação."""
+        self._documentos[caminho] = dados
+        self.marcar_sujo(caminho)
+
+    def marcar_sujo(self, caminho: str):
+        self._sujos.add(caminho)
+        self._agendar_flush()
+
+    def enfileirar(self, sql: str, params=()):
+        """Agenda uma operação de linha (UPSERT/DELETE) para o próximo flush."""
+        self._operacoes.append((sql, params))
+        self._agendar_flush()
+
+    def _agendar_flush(self):
+        if self._flush_agendado is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Fora do event loop (scripts, desligamento): grava na hora
+            self.flush_sync()
+            return
+        self._flush_agendado = loop.call_later(self.intervalo_flush, self._disparar_flush)
+
+    def _disparar_flush(self):
+        self._tarefa_flush = asyncio.get_running_loop().create_task(self.flush())
+
+    def _montar_lote(self):
+        # A serialização acontece no loop para capturar um estado consistente
+        documentos = {
+            caminho: json.dumps(self._documentos[caminho], ensure_ascii=False)
+            for caminho in self._sujos
+        }
+        operacoes = self._operacoes
+        self._sujos = set()
+        self._operacoes = []
+        ops = list(operacoes)
+        ops.extend(self.db.op_gravar_documento(nome_documento(c), conteudo) for c, conteudo in documentos.items())
+        return documentos, operacoes, ops
+
+    def _devolver_lote(self, documentos, operacoes):
+        self._sujos.update(documentos)
+        self._operacoes[:0] = operacoes
+
+    async def flush(self):
+        """Grava tudo o que está pendente em uma única transação."""
+        if self._flush_agendado is not None:
+            self._flush_agendado.cancel()
+            self._flush_agendado = None
+        if not self._sujos and not self._operacoes:
+            return
+        async with self._lock_gravacao:
+            documentos, operacoes, ops = self._montar_lote()
+            if not ops:
+                return
+            try:
+                self.abrir()
+                await io_pool.executar("store.flush", self.db.executar_lote, ops)
+                logger.debug(f"💾 Flush: {len(documentos)} documento(s), {len(operacoes)} operação(ões)")
+            except Exception as e:
+                logger.error(f"❌ Erro ao gravar estado: {e}")
+                self._devolver_lote(documentos, operacoes)
+                self._agendar_flush()
+
+    def flush_sync(self):
+        """Versão bloqueante do flush, para uso fora do event loop."""
+        if self._flush_agendado is not None:
+            self._flush_agendado.cancel()
+            self._flush_agendado = None
+        if not self._sujos and not self._operacoes:
+            return
+        documentos, operacoes, ops = self._montar_lote()
+        try:
+            self.abrir()
+            self.db.executar_lote(ops)
+        except Exception as e:
+            logger.error(f"❌ Erro ao gravar estado: {e}")
+            self._devolver_lote(documentos, operacoes)
+
+
+# Instância única usada por todos os cogs
+store = StateStore()
+
+__all__ = ['StateStore', 'store', 'nome_documento', 'INTERVALO_FLUSH']
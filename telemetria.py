@@ -0,0 +1,134 @@
+# cogs/telemetria.py
+"""
+Métricas de execução dos jobs e prazos agendados.
+
+Para cada job (ou grupo de prazos do agendador) registra o atraso de início
+em relação ao horário previsto, um histograma de duração, erros e overruns
+(disparos que chegaram com a execução anterior ainda em andamento).
+"""
+
+import json
+import os
+
+# Limites superiores das faixas do histograma de duração, em segundos
+FAIXAS_DURACAO = (0.01, 0.1, 1.0, 10.0, 60.0)
+
+
+def _rotulo_faixa(limite: float | None) -> str:
+    if limite is None:
+        return f">{FAIXAS_DURACAO[-1]:g}s"
+    return f"<{limite * 1000:g}ms" if limite < 1 else f"<{limite:g}s"
+
+
+class MetricaExecucao:
+    __slots__ = (
+        "execucoes", "erros", "overruns", "histograma",
+        "duracao_total", "duracao_maxima", "ultima_duracao",
+        "atraso_total", "atraso_maximo", "ultimo_atraso",
+    )
+
+    def __init__(self):
+        self.execucoes = 0
+        self.erros = 0
+        self.overruns = 0
+        self.histograma = [0] * (len(FAIXAS_DURACAO) + 1)
+        self.duracao_total = 0.0
+        self.duracao_maxima = 0.0
+        self.ultima_duracao = 0.0
+        self.atraso_total = 0.0
+        self.atraso_maximo = 0.0
+        self.ultimo_atraso = 0.0
+
+    def registrar(self, atraso: float, duracao: float, erro: bool):
+        self.execucoes += 1
+        self.erros += int(erro)
+        self.ultima_duracao = duracao
+        self.duracao_total += duracao
+        self.duracao_maxima = max(self.duracao_maxima, duracao)
+        self.ultimo_atraso = atraso
+        self.atraso_total += atraso
+        self.atraso_maximo = max(self.atraso_maximo, atraso)
+        for i, limite in enumerate(FAIXAS_DURACAO):
+            if duracao < limite:
+                self.histograma[i] += 1
+                break
+        else:
+            self.histograma[-1] += 1
+
+    def registrar_overrun(self):
+        self.overruns += 1
+
+    @property
+    def duracao_media(self) -> float:
+        return self.duracao_total / self.execucoes if self.execucoes else 0.0
+
+    @property
+    def atraso_medio(self) -> float:
+        return self.atraso_total / self.execucoes if self.execucoes else 0.0
+
+    def faixas(self) -> dict:
+        rotulos = [_rotulo_faixa(limite) for limite in FAIXAS_DURACAO] + [_rotulo_faixa(None)]
+        return dict(zip(rotulos, self.histograma))
+
+    def como_dict(self) -> dict:
+        return {
+            "execucoes": self.execucoes,
+            "erros": self.erros,
+            "overruns": self.overruns,
+            "duracao": {
+                "media": self.duracao_media,
+                "maxima": self.duracao_maxima,
+                "ultima": self.ultima_duracao,
+                "histograma": self.faixas(),
+            },
+            "atraso": {
+                "medio": self.atraso_medio,
+                "maximo": self.atraso_maximo,
+                "ultimo": self.ultimo_atraso,
+            },
+        }
+
+
+class MetricaTrava:
+    """Contenção de uma trava: quantas aquisições precisaram esperar e por quanto tempo."""
+    __slots__ = ("aquisicoes", "contendidas", "espera_total", "espera_maxima", "posse_total", "posse_maxima")
+
+    def __init__(self):
+        self.aquisicoes = 0
+        self.contendidas = 0
+        self.espera_total = 0.0
+        self.espera_maxima = 0.0
+        self.posse_total = 0.0
+        self.posse_maxima = 0.0
+
+    def registrar(self, espera: float, posse: float, contendida: bool):
+        self.aquisicoes += 1
+        self.contendidas += int(contendida)
+        self.espera_total += espera
+        self.espera_maxima = max(self.espera_maxima, espera)
+        self.posse_total += posse
+        self.posse_maxima = max(self.posse_maxima, posse)
+
+    @property
+    def espera_media(self) -> float:
+        return self.espera_total / self.aquisicoes if self.aquisicoes else 0.0
+
+
+# Métricas das travas por nome. Ficam aqui, fora dos cogs: um cog recarregado (ou importado
+# por outro antes de virar extensão) é um módulo novo, e a contagem precisa ser uma só
+metricas_travas = {}
+
+def metrica_trava(nome: str) -> MetricaTrava:
+    return metricas_travas.setdefault(nome, MetricaTrava())
+
+
+def gravar_json(caminho: str, dados: dict):
+    """Grava o arquivo de métricas de forma atômica (bloqueante: use via io_pool)."""
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    temporario = f"{caminho}.tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(dados, f, indent=4, ensure_ascii=False)
+    os.replace(temporario, caminho)
+
+
+__all__ = ['MetricaExecucao', 'MetricaTrava', 'metricas_travas', 'metrica_trava', 'FAIXAS_DURACAO', 'gravar_json']
@@ -1,16 +1,20 @@
-import json
-import os
 import logging
-import aiofiles
+
+from .store import store
 
 logger = logging.getLogger(__name__)
 
 # --- Variáveis de Configuração Globais ---
 CATEGORIA_VOZ_ID = 1253823465962864896  # ID da categoria para canais de voz temporários
 TEMPO_VIDA_CANAL = 120  # Tempo em minutos para canais de voz inativos serem deletados
+# Pool de canais de voz pré-criados para as raids (renomeados ao serem usados)
+POOL_VOZ_TAMANHO = 3  # Quantidade mantida livre após uma reposição
+POOL_VOZ_MINIMO = 1   # Abaixo disso o pool é reposto até POOL_VOZ_TAMANHO
+POOL_VOZ_MAXIMO = 5   # Acima disso os canais devolvidos são apagados
 RESET_HORA = "00:30"  # Hora para reset diário de eventos/presenças
 CALENDARIO_COR_EMBED = 0x9B59B6  # Cor padrão para embeds do calendário
 LIMPAR_MENSAGENS_ANTIGAS = True  # Configuração para limpar mensagens antigas do bot
+JANELA_EDICAO = 2.0  # Segundos mínimos entre duas edições da mesma mensagem de painel
 
 # Configuração padrão do calendário (pode ser atualizada pelo cog de calendário)
 calendario_config = {
@@ -30,91 +34,44 @@ MSG_JSON_CONFIG_FILE = "data/mensagem_json_config.json"
 MENSAGENS_EVENTOS_FILE = "data/mensagens_eventos.json"  # Para o sistema de raids/eventos
 
 # --- Funções Utilitárias Genéricas ---
+# As leituras vêm do store em memória; as gravações são agrupadas por ele.
 
 async def carregar_guias():
-    """Carrega os guias do arquivo JSON async."""
-    try:
-        if os.path.exists(GUIAS_FILE):
-            async with aiofiles.open(GUIAS_FILE, 'r', encoding='utf-8') as f:
-                conteudo = await f.read()
-                return json.loads(conteudo)
-        return {}
-    except Exception as e:
-        logger.error(f"Erro ao carregar guias: {e}")
-        return {}
+    """Carrega os guias do store em memória."""
+    return store.carregar(GUIAS_FILE, {})
 
 async def salvar_guias(guias):
-    """Salva os guias no arquivo JSON async."""
-    try:
-        os.makedirs(os.path.dirname(GUIAS_FILE), exist_ok=True)
-        async with aiofiles.open(GUIAS_FILE, 'w', encoding='utf-8') as f:
-            await f.write(json.dumps(guias, indent=4, ensure_ascii=False))
-    except Exception as e:
-        logger.error(f"Erro ao salvar guias: {e}")
+    """Marca os guias para gravação no próximo flush."""
+    store.definir(GUIAS_FILE, guias)
 
 # --- Funções para o calendário ---
 
 async def carregar_calendario():
-    try:
-        if os.path.exists(CALENDARIO_FILE):
-            async with aiofiles.open(CALENDARIO_FILE, 'r', encoding='utf-8') as f:
-                conteudo = await f.read()
-                return json.loads(conteudo)
-        return []
-    except Exception as e:
-        logger.error(f"Erro ao carregar calendário: {e}")
-        return []
+    return store.carregar(CALENDARIO_FILE, [])
 
 async def salvar_calendario(eventos):
-    try:
-        os.makedirs(os.path.dirname(CALENDARIO_FILE), exist_ok=True)
-        async with aiofiles.open(CALENDARIO_FILE, 'w', encoding='utf-8') as f:
-            await f.write(json.dumps(eventos, indent=4, ensure_ascii=False))
-    except Exception as e:
-        logger.error(f"Erro ao salvar calendário: {e}")
+    store.definir(CALENDARIO_FILE, eventos)
 
 async def salvar_mensagem_calendario(msg_id, canal_id):
-    try:
-        os.makedirs(os.path.dirname(CALENDARIO_MSG_FILE), exist_ok=True)
-        async with aiofiles.open(CALENDARIO_MSG_FILE, 'w', encoding='utf-8') as f:
-            await f.write(json.dumps({"msg_id": msg_id, "canal_id": canal_id}))
-    except Exception as e:
-        logger.error(f"Erro ao salvar mensagem do calendário: {e}")
+    store.definir(CALENDARIO_MSG_FILE, {"msg_id": msg_id, "canal_id": canal_id})
 
 async def carregar_mensagem_calendario():
-    try:
-        if os.path.exists(CALENDARIO_MSG_FILE):
-            async with aiofiles.open(CALENDARIO_MSG_FILE, 'r', encoding='utf-8') as f:
-                conteudo = await f.read()
-                data = json.loads(conteudo)
-                return data.get("msg_id"), data.get("canal_id")
-        return None, None
-    except Exception as e:
-        logger.error(f"Erro ao carregar mensagem do calendário: {e}")
-        return None, None
+    data = store.carregar(CALENDARIO_MSG_FILE, {})
+    return data.get("msg_id"), data.get("canal_id")
 
 async def salvar_configuracoes_calendario():
-    try:
-        os.makedirs(os.path.dirname(CALENDARIO_CONFIG_FILE), exist_ok=True)
-        async with aiofiles.open(CALENDARIO_CONFIG_FILE, 'w', encoding='utf-8') as f:
-            await f.write(json.dumps(calendario_config, indent=4))
-    except Exception as e:
-        logger.error(f"Erro ao salvar configurações do calendário: {e}")
+    store.definir(CALENDARIO_CONFIG_FILE, calendario_config)
 
 async def carregar_configuracoes_calendario():
-    try:
-        if os.path.exists(CALENDARIO_CONFIG_FILE):
-            async with aiofiles.open(CALENDARIO_CONFIG_FILE, 'r', encoding='utf-8') as f:
-                conteudo = await f.read()
-                configuracoes = json.loads(conteudo)
-                calendario_config.update(configuracoes)
-    except Exception as e:
-        logger.error(f"Erro ao carregar configurações do calendário: {e}")
+    configuracoes = store.carregar(CALENDARIO_CONFIG_FILE, {})
+    if configuracoes is not calendario_config:
+        calendario_config.update(configuracoes)
 
 # Define o que será exportado
 __all__ = [
-    'CATEGORIA_VOZ_ID', 'TEMPO_VIDA_CANAL', 'RESET_HORA', 'CALENDARIO_COR_EMBED',
-    'LIMPAR_MENSAGENS_ANTIGAS', 'calendario_config',
+    'CATEGORIA_VOZ_ID', 'TEMPO_VIDA_CANAL', 'POOL_VOZ_TAMANHO', 'POOL_VOZ_MINIMO', 'POOL_VOZ_MAXIMO',
+    'RESET_HORA', 'CALENDARIO_COR_EMBED',
+    'LIMPAR_MENSAGENS_ANTIGAS', 'JANELA_EDICAO', 'calendario_config',
     'CALENDARIO_FILE', 'CALENDARIO_MSG_FILE', 'CALENDARIO_CONFIG_FILE',
     'GUIAS_FILE', 'MSG_JSON_CONFIG_FILE', 'MENSAGENS_EVENTOS_FILE',
     'carregar_guias', 'salvar_guias',
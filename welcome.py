@@ -1,9 +1,15 @@
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
 from discord import app_commands
+import bisect
+import calendar
 import datetime
-import json
-import os
+import pytz
+import re
+
+from . import utils
+from .store import store
+from .jobs import motor, Horario
 
 GUILD_ID = 1253822715375390780
 WELCOME_JSON_PATH = "data/welcome.json"
@@ -17,43 +23,143 @@ def load_config():
         "default_role_id": 1253825850269372446,
         "users_changed_nick": []  # Corrigido: vírgula após o item anterior
     }
-    
-    os.makedirs("data", exist_ok=True)
-    
-    if not os.path.exists(WELCOME_JSON_PATH):
-        with open(WELCOME_JSON_PATH, "w") as f:
-            json.dump(default, f, indent=4)
-        return default
-    else:
-        with open(WELCOME_JSON_PATH, "r") as f:
-            config = json.load(f)
-        
-        updated = False
-        for key in default:
-            if key not in config:
-                config[key] = default[key]
-                updated = True
-        if updated:
-            save_config(config)
 
-        return config
+    config = store.carregar(WELCOME_JSON_PATH, default)
+
+    updated = False
+    for key in default:
+        if key not in config:
+            config[key] = default[key]
+            updated = True
+    if updated:
+        save_config(config)
+
+    return config
 
 def save_config(data):
-    with open(WELCOME_JSON_PATH, "w") as f:
-        json.dump(data, f, indent=4)
+    store.definir(WELCOME_JSON_PATH, data)
 
 def load_birthdays():
-    if not os.path.exists(BIRTHDAY_JSON_PATH):
-        with open(BIRTHDAY_JSON_PATH, "w") as f:
-            json.dump({}, f, indent=4)
-        return {}
-    else:
-        with open(BIRTHDAY_JSON_PATH, "r") as f:
-            return json.load(f)
+    return store.carregar(BIRTHDAY_JSON_PATH, {})
 
 def save_birthdays(data):
-    with open(BIRTHDAY_JSON_PATH, "w") as f:
-        json.dump(data, f, indent=4)
+    store.definir(BIRTHDAY_JSON_PATH, data)
+
+def fuso_guilda():
+    return pytz.timezone(utils.calendario_config.get("timezone", "America/Sao_Paulo"))
+
+class IndiceAniversarios:
+    """
+    Aniversários indexados por (mês, dia).
+
+    `do_dia` devolve só o balde do dia e `proximos` percorre os dias em ordem
+    a partir de hoje (com busca binária), sem varrer todos os registros.
+    """
+
+    def __init__(self):
+        self._por_dia = {}       # (mes, dia) -> set(user_id)
+        self._dias = []          # chaves (mes, dia) ordenadas, só as que têm alguém
+        self._data_usuario = {}  # user_id -> (mes, dia)
+
+    @staticmethod
+    def _chave(data: str) -> tuple:
+        dia, mes = data.split("/")
+        return int(mes), int(dia)
+
+    def carregar(self, birthdays: dict):
+        self._por_dia.clear()
+        self._data_usuario.clear()
+        for user_id, data in birthdays.items():
+            try:
+                self._adicionar(user_id, self._chave(data))
+            except ValueError:
+                continue
+        self._dias = sorted(self._por_dia)
+
+    def _adicionar(self, user_id: str, chave: tuple):
+        self._por_dia.setdefault(chave, set()).add(user_id)
+        self._data_usuario[user_id] = chave
+
+    def definir(self, user_id: str, data: str):
+        """Atualiza o índice (e o documento persistido) para um usuário."""
+        chave = self._chave(data)
+        antiga = self._data_usuario.get(user_id)
+        if antiga is not None:
+            balde = self._por_dia[antiga]
+            balde.discard(user_id)
+            if not balde:
+                del self._por_dia[antiga]
+                self._dias.pop(bisect.bisect_left(self._dias, antiga))
+        if chave not in self._por_dia:
+            bisect.insort(self._dias, chave)
+        self._adicionar(user_id, chave)
+
+        birthdays = load_birthdays()
+        birthdays[user_id] = data
+        save_birthdays(birthdays)
+
+    def do_dia(self, hoje: datetime.date) -> set:
+        usuarios = set(self._por_dia.get((hoje.month, hoje.day), ()))
+        if (hoje.month, hoje.day) == (2, 28) and not calendar.isleap(hoje.year):
+            # Quem nasceu em 29/02 comemora em 28/02 nos anos não bissextos
+            usuarios |= self._por_dia.get((2, 29), set())
+        return usuarios
+
+    def proximos(self, hoje: datetime.date, limite: int = 10) -> list:
+        """[(data, user_id)] dos próximos aniversários a partir de hoje (inclusive)."""
+        resultado = []
+        if not self._dias:
+            return resultado
+        inicio = bisect.bisect_left(self._dias, (hoje.month, hoje.day))
+        for i in range(len(self._dias)):
+            mes, dia = self._dias[(inicio + i) % len(self._dias)]
+            ano = hoje.year + (1 if inicio + i >= len(self._dias) else 0)
+            if (mes, dia) == (2, 29) and not calendar.isleap(ano):
+                quando = datetime.date(ano, 2, 28)
+            else:
+                quando = datetime.date(ano, mes, dia)
+            for user_id in sorted(self._por_dia[(mes, dia)]):
+                resultado.append((quando, user_id))
+                if len(resultado) >= limite:
+                    return resultado
+        return resultado
+
+    def proximo(self, hoje: datetime.date):
+        proximos = self.proximos(hoje, 1)
+        return proximos[0] if proximos else None
+
+# Índice único, mantido em sincronia pelo BirthdayModal
+aniversarios = IndiceAniversarios()
+
+class RegistroApelidos:
+    """
+    Usuários que já definiram o nome de família ("users_changed_nick").
+
+    A consulta é feita em um set em memória; o registro só acrescenta ao
+    documento e deixa a gravação para o store.
+    """
+
+    def __init__(self):
+        self._usuarios = set()
+        self._lista = []
+
+    def carregar(self, config: dict):
+        self._lista = config.setdefault("users_changed_nick", [])
+        self._usuarios = {str(u) for u in self._lista}
+
+    def __contains__(self, user_id) -> bool:
+        return str(user_id) in self._usuarios
+
+    def registrar(self, user_id):
+        user_id = str(user_id)
+        if user_id in self._usuarios:
+            return
+        self._usuarios.add(user_id)
+        self._lista.append(user_id)
+        store.marcar_sujo(WELCOME_JSON_PATH)
+
+# Registro único, carregado pelo cog Welcome
+apelidos = RegistroApelidos()
 
 async def log_to_discord(bot, message: str, embed: discord.Embed = None):
     try:
@@ -83,28 +189,60 @@ class BirthdayModal(discord.ui.Modal, title="🎂 Definir Aniversário"):
     async def on_submit(self, interaction: discord.Interaction):
         data = self.birthday.value
         try:
-            datetime.datetime.strptime(data, "%d/%m")
+            datetime.datetime.strptime(f"{data}/2000", "%d/%m/%Y")  # Ano bissexto: aceita 29/02
         except ValueError:
             await interaction.response.send_message("❌ Formato inválido! Use DD/MM, exemplo: 09/07", ephemeral=True)
             return
 
-        birthdays = load_birthdays()
-        birthdays[self.user_id] = data
-        save_birthdays(birthdays)
+        aniversarios.definir(self.user_id, data)
 
         await log_to_discord(self.bot, f"Aniversário registrado para <@{self.user_id}>: {data}")
         await interaction.response.send_message(f"✅ Aniversário registrado para {data}!", ephemeral=True)
 
-class BirthdayButtonView(discord.ui.View):
-    def __init__(self, bot, *, timeout=None):
-        super().__init__(timeout=timeout)
-        self.bot = bot
+# Botões das mensagens de boas-vindas (enviadas por DM a cada membro): itens dinâmicos com
+# custom_id fixo, registrados uma vez para continuarem funcionando após reinicializações
+class BotaoAniversario(discord.ui.DynamicItem[discord.ui.Button], template="btn_birthday_set"):
+    def __init__(self):
+        super().__init__(discord.ui.Button(label="🎂 Definir Aniversário", style=discord.ButtonStyle.blurple, custom_id="btn_birthday_set"))
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match: re.Match):
+        return cls()
+
+    async def callback(self, interaction: discord.Interaction):
+        modal = BirthdayModal(interaction.client, interaction.user.id)
+        await interaction.response.send_modal(modal)
+
+class BotaoApelido(discord.ui.DynamicItem[discord.ui.Button], template="btn_nickname_set"):
+    def __init__(self, desabilitado: bool = False):
+        super().__init__(discord.ui.Button(
+            label="🛠️ Definir seu nome de família",
+            style=discord.ButtonStyle.green,
+            custom_id="btn_nickname_set",
+            disabled=desabilitado
+        ))
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match: re.Match):
+        return cls()
+
+    async def callback(self, interaction: discord.Interaction):
+        # Verifica se já mudou o nick antes
+        if interaction.user.id in apelidos:
+            await interaction.response.send_message(
+                "❌ Você já definiu seu nome de família anteriormente. Contate um moderador se precisar alterar.",
+                ephemeral=True
+            )
+            return
 
-    @discord.ui.button(label="🎂 Definir Aniversário", style=discord.ButtonStyle.blurple, custom_id="btn_birthday_set")
-    async def birthday_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        modal = BirthdayModal(self.bot, interaction.user.id)
+        modal = NicknameModal(interaction.client, interaction.user.id)
         await interaction.response.send_modal(modal)
 
+class BirthdayButtonView(discord.ui.View):
+    def __init__(self, *, timeout=None):
+        super().__init__(timeout=timeout)
+        self.add_item(BotaoAniversario())
+
 class NicknameModal(discord.ui.Modal, title="🛠️ Configurar Nome de Família"):
     def __init__(self, bot, user_id: int):
         super().__init__()
@@ -122,8 +260,7 @@ class NicknameModal(discord.ui.Modal, title="🛠️ Configurar Nome de Família
     async def on_submit(self, interaction: discord.Interaction):
         try:
             # Verifica se já mudou o nick antes
-            config = load_config()
-            if str(self.user_id) in config.get("users_changed_nick", []):
+            if self.user_id in apelidos:
                 await interaction.response.send_message(
                     "❌ Você já definiu seu nome de família anteriormente. Contate um moderador se precisar alterar.",
                     ephemeral=True
@@ -137,11 +274,7 @@ class NicknameModal(discord.ui.Modal, title="🛠️ Configurar Nome de Família
                 await member.edit(nick=self.nickname.value)
                 
                 # Atualiza a lista de usuários que já mudaram o nick
-                config = load_config()
-                if "users_changed_nick" not in config:
-                     config["users_changed_nick"] = []
-                config["users_changed_nick"].append(str(self.user_id))
-                save_config(config)
+                apelidos.registrar(self.user_id)
 
                 await interaction.response.send_message(
                     f"✅ Seu nome de família foi definido como: **{self.nickname.value}**\n"
@@ -151,10 +284,7 @@ class NicknameModal(discord.ui.Modal, title="🛠️ Configurar Nome de Família
                 await log_to_discord(self.bot, f"{interaction.user.name} definiu seu apelido para: {self.nickname.value}")
 
                 # Desabilita o botão na mensagem original
-                view = WelcomeView(self.bot, self.user_id)
-                for child in view.children:
-                    if child.custom_id == "btn_nickname_set":
-                        child.disabled = True
+                view = WelcomeView(apelido_definido=True)
                 try:
                     await interaction.message.edit(view=view)
                 except Exception as e:
@@ -172,43 +302,32 @@ class NicknameModal(discord.ui.Modal, title="🛠️ Configurar Nome de Família
             )
 
 class WelcomeView(discord.ui.View):
-    def __init__(self, bot, user_id: int):
+    def __init__(self, apelido_definido: bool = False):
         super().__init__(timeout=None)
-        self.bot = bot
-        self.user_id = user_id
-
-    @discord.ui.button(label="🎂 Definir Aniversário", style=discord.ButtonStyle.blurple, custom_id="btn_birthday_set")
-    async def birthday_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        modal = BirthdayModal(self.bot, interaction.user.id)
-        await interaction.response.send_modal(modal)
-
-    @discord.ui.button(label="🛠️ Definir seu nome de família", style=discord.ButtonStyle.green, custom_id="btn_nickname_set")
-    async def nickname_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        # Verifica se já mudou o nick antes
-        config = load_config()
-        if str(self.user_id) in config.get("users_changed_nick", []):
-            await interaction.response.send_message(
-                "❌ Você já definiu seu nome de família anteriormente. Contate um moderador se precisar alterar.",
-                ephemeral=True
-            )
-            return
-
-        modal = NicknameModal(self.bot, interaction.user.id)
-        await interaction.response.send_modal(modal)
+        self.add_item(BotaoAniversario())
+        self.add_item(BotaoApelido(desabilitado=apelido_definido))
 
 class Welcome(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        # Carrega os documentos na inicialização; depois disso as leituras vêm da memória
         self.config = load_config()
+        apelidos.carregar(self.config)
+        aniversarios.carregar(load_birthdays())
         self.welcome_channel_id = self.config.get("welcome_channel_id", 1253823054824345653)
         self.default_role_id = self.config.get("default_role_id", 1253825850269372446)
         self.rules_channel_id = 1253822853695012917
         self.parabens_channel_id = 1390817125861687407
 
-        self.check_birthdays.start()
+        # Meia-noite no fuso da guilda (o gatilho acompanha mudanças de offset)
+        motor.registrar(
+            "welcome.aniversarios", Horario("00:00", fuso=fuso_guilda().zone),
+            self.check_birthdays, dono=self.qualified_name
+        )
 
     def cog_unload(self):
-        self.check_birthdays.cancel()
+        motor.remover_do_dono(self.qualified_name)
+        self.bot.remove_dynamic_items(BotaoAniversario, BotaoApelido)
 
     @commands.Cog.listener()
     async def on_ready(self):
@@ -272,13 +391,8 @@ class Welcome(commands.Cog):
                 dm_embed.set_footer(text="Bot • Boas-vindas")
                 
                 # Verifica se já mudou o nick antes
-                config = load_config()
-                view = WelcomeView(self.bot, member.id)
-                if str(member.id) in config.get("users_changed_nick", []):
-                    for child in view.children:
-                        if child.custom_id == "btn_nickname_set":
-                            child.disabled = True
-                
+                view = WelcomeView(apelido_definido=member.id in apelidos)
+
                 await member.send(embed=dm_embed, view=view)
             except discord.Forbidden:
                 await log_to_discord(self.bot, f"Não foi possível enviar DM para {member.name}")
@@ -451,39 +565,54 @@ class Welcome(commands.Cog):
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
 
-    @tasks.loop(time=datetime.time(hour=12, minute=0, tzinfo=datetime.timezone.utc))
+    @app_commands.command(name="proximos_aniversarios", description="Veja os próximos aniversariantes")
+    async def proximos_aniversarios(self, interaction: discord.Interaction, quantidade: app_commands.Range[int, 1, 25] = 10):
+        hoje = datetime.datetime.now(fuso_guilda()).date()
+        proximos = aniversarios.proximos(hoje, quantidade)
+        if not proximos:
+            await interaction.response.send_message("🎂 Nenhum aniversário foi registrado ainda.", ephemeral=True)
+            return
+
+        lines = []
+        for quando, user_id in proximos:
+            dias = (quando - hoje).days
+            quando_txt = "hoje 🎉" if dias == 0 else "amanhã" if dias == 1 else f"em {dias} dias"
+            lines.append(f"<@{user_id}> — **{quando.strftime('%d/%m')}** ({quando_txt})")
+
+        embed = discord.Embed(
+            title="🎂 Próximos Aniversários",
+            description="\n".join(lines),
+            color=0xFFC0CB
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
     async def check_birthdays(self):
-        today = datetime.datetime.utcnow().strftime("%d/%m")
-        birthdays = load_birthdays()
+        hoje = datetime.datetime.now(fuso_guilda()).date()
         guild = self.bot.get_guild(GUILD_ID)
         if not guild:
             await log_to_discord(self.bot, "⚠️ Guild não encontrada para verificar aniversários")
             return
 
-        for user_id, data in birthdays.items():
-            if data == today:
-                member = guild.get_member(int(user_id))
-                if member:
-                    embed = discord.Embed(
-                        title="🎉 Feliz Aniversário! 🎂",
-                        description=f"Hoje é o aniversário do(a) {member.mention}! Que seu dia seja incrível! 🥳",
-                        color=0xFFD700,
-                        timestamp=datetime.datetime.utcnow()
-                    )
-                    embed.set_thumbnail(url=member.display_avatar.url)
-                    embed.set_footer(text="Bot • Parabéns!")
-                    try:
-                        channel = guild.get_channel(self.parabens_channel_id)
-                        if channel:
-                            await channel.send(embed=embed)
-                        await member.send(embed=embed)
-                        await log_to_discord(self.bot, f"Parabéns enviados para {member.display_name} pelo aniversário!")
-                    except discord.Forbidden:
-                        await log_to_discord(self.bot, f"Não foi possível enviar mensagem de aniversário para {member.display_name}")
-
-    @check_birthdays.before_loop
-    async def before_check_birthdays(self):
-        await self.bot.wait_until_ready()
+        for user_id in aniversarios.do_dia(hoje):
+            member = guild.get_member(int(user_id))
+            if member:
+                embed = discord.Embed(
+                    title="🎉 Feliz Aniversário! 🎂",
+                    description=f"Hoje é o aniversário do(a) {member.mention}! Que seu dia seja incrível! 🥳",
+                    color=0xFFD700,
+                    timestamp=datetime.datetime.utcnow()
+                )
+                embed.set_thumbnail(url=member.display_avatar.url)
+                embed.set_footer(text="Bot • Parabéns!")
+                try:
+                    channel = guild.get_channel(self.parabens_channel_id)
+                    if channel:
+                        await channel.send(embed=embed)
+                    await member.send(embed=embed)
+                    await log_to_discord(self.bot, f"Parabéns enviados para {member.display_name} pelo aniversário!")
+                except discord.Forbidden:
+                    await log_to_discord(self.bot, f"Não foi possível enviar mensagem de aniversário para {member.display_name}")
 
 async def setup(bot):
+    bot.add_dynamic_items(BotaoAniversario, BotaoApelido)
     await bot.add_cog(Welcome(bot))
\ No newline at end of file